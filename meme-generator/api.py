@@ -0,0 +1,141 @@
+"""HTTP service that renders top/bottom-text memes.
+
+    fastapi dev api.py
+
+Upload a template once with POST /templates, then render it as often as you
+like with GET /memes/{template_id}?top=...&bottom=...&format=webp
+"""
+import asyncio
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image, UnidentifiedImageError
+
+from meme_layout import render_meme
+
+app = FastAPI()
+
+# format -> (PIL format, mime type, save options)
+FORMATS = {
+    "png": ("PNG", "image/png", {}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 90}),
+    "webp": ("WEBP", "image/webp", {"quality": 90}),
+}
+HEX_COLOR = "^#[0-9A-Fa-f]{6}$"
+
+# PIL releases the GIL while drawing and encoding, so a few threads keep every
+# core busy; more would only pile up decoded images in memory
+RENDER_WORKERS = 4
+render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class TemplateCache:
+    """LRU of decoded template images, bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        size = image.width * image.height * len(image.getbands())
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = image
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.width * evicted.height * len(evicted.getbands())
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+templates = TemplateCache()
+
+
+def decode_template(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image if image.mode in ("RGB", "RGBA") else image.convert("RGB")
+
+
+def render_bytes(image, top, bottom, image_format, max_font_size, color, outline):
+    pil_format, _, options = FORMATS[image_format]
+    meme = render_meme(image, top, bottom, max_font_size, color, outline)
+    if pil_format == "JPEG" and meme.mode != "RGB":
+        meme = meme.convert("RGB")
+    buffer = io.BytesIO()
+    meme.save(buffer, format=pil_format, **options)
+    return buffer.getbuffer()
+
+
+def iter_chunks(data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags or "*" in tags
+
+
+@app.post("/templates")
+async def upload_template(file: UploadFile = File(...)):
+    """Upload a template image and return the id to render it with"""
+    data = await file.read()
+    template_id = hashlib.sha256(data).hexdigest()
+    image = templates.get(template_id)
+    if image is None:
+        try:
+            image = await asyncio.wrap_future(render_pool.submit(decode_template, data))
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise HTTPException(status_code=400, detail="Not a supported image")
+        templates.put(template_id, image)
+    return {"template_id": template_id, "width": image.width, "height": image.height}
+
+
+@app.get("/memes/{template_id}")
+async def render(
+    request: Request,
+    template_id: str,
+    top: str = "",
+    bottom: str = "",
+    format: str = Query("png", pattern="^(png|jpeg|webp)$"),
+    max_font_size: int = Query(60, ge=10, le=300),
+    color: str = Query("#FFFFFF", pattern=HEX_COLOR),
+    outline: str = Query("#000000", pattern=HEX_COLOR),
+):
+    """Render a meme from an uploaded template"""
+    # The output only depends on the template and the options, so identical
+    # requests share one ETag and a client that has it gets a 304 without rendering
+    key = repr((template_id, top, bottom, format, max_font_size, color.upper(), outline.upper()))
+    etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    image = templates.get(template_id)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Unknown template; upload it to /templates first")
+    data = await asyncio.wrap_future(
+        render_pool.submit(render_bytes, image, top, bottom, format, max_font_size, color, outline))
+    return StreamingResponse(iter_chunks(data), media_type=FORMATS[format][1],
+                             headers={**headers, "Content-Length": str(len(data))})
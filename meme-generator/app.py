@@ -1,41 +1,47 @@
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import io
 
+from meme_animation import ANIMATED_FORMATS, animation_bytes, is_animated
+from meme_layout import render_meme
+
 st.set_page_config(page_title="Meme Factory", page_icon="😂")
 st.title("🤖 Instant Meme Generator")
 
 # Image upload section
-uploaded_image = st.file_uploader("Meme ke liye photo chuno", type=["jpg", "png"])
+uploaded_image = st.file_uploader("Meme ke liye photo chuno", type=["jpg", "png", "gif", "webp"])
 
 # Text inputs
 top_text = st.text_input("Top Text")
 bottom_text = st.text_input("Bottom Text")
 
 # Customization options
-font_size = st.slider("Font Size", 20, 60, 40)
+font_size = st.slider("Max Font Size", 20, 120, 60)
 text_color = st.color_picker("Text Color", "#FFFFFF")
+outline_color = st.color_picker("Outline Color", "#000000")
 
 if uploaded_image and (top_text or bottom_text):
     # Image processing start
     img = Image.open(uploaded_image)
-    draw = ImageDraw.Draw(img)
-    width, height = img.size
-    
-    # Font settings
-    font = ImageFont.truetype("arial.ttf", font_size)
     
-    # Top text positioning
-    if top_text:
-        text_width = draw.textlength(top_text, font=font)
-        x = (width - text_width) / 2
-        draw.text((x, 10), top_text, fill=text_color, font=font)
+    # Animated PNGs fall through to the still path (first frame); only GIF/WebP are written animated
+    if is_animated(img) and img.format in ANIMATED_FORMATS:
+        # Animated GIF/WebP: the captions are rasterized once and composited
+        # onto each frame while it is encoded, one frame at a time
+        data, image_format = animation_bytes(img, top_text, bottom_text, font_size, text_color, outline_color)
+        st.image(data, caption="Your Custom Meme")
+        st.download_button(
+            label="📸 Download Meme",
+            data=data,
+            file_name=f"my_meme.{image_format.lower()}",
+            mime=ANIMATED_FORMATS[image_format]
+        )
+        st.stop()
     
-    # Bottom text positioning
-    if bottom_text:
-        text_width = draw.textlength(bottom_text, font=font)
-        x = (width - text_width) / 2
-        draw.text((x, height-50), bottom_text, fill=text_color, font=font)
+    # Captions are wrapped and shrunk (down from the max size) until they fit;
+    # the bottom one sits on the bottom margin, whatever its size and line count.
+    # Fonts and measurements are cached across reruns.
+    img = render_meme(img, top_text, bottom_text, font_size, text_color, outline_color)
     
     # Show final image
     st.image(img, caption="Your Custom Meme")
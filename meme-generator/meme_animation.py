@@ -0,0 +1,129 @@
+import io
+
+from PIL import Image, ImageColor, ImageDraw, ImageSequence
+
+from meme_fonts import find_font, get_font
+from meme_layout import layout_caption, stroke_width
+
+# Frame duration (ms) for frames that don't say
+DEFAULT_DURATION = 100
+
+# Animated formats we read and write: PIL format -> mime type
+ANIMATED_FORMATS = {"GIF": "image/gif", "WEBP": "image/webp"}
+
+
+def is_animated(image):
+    return getattr(image, "is_animated", False) and getattr(image, "n_frames", 1) > 1
+
+
+def caption_layer(size, top_text, bottom_text, max_size=60, fill="#FFFFFF", outline="#000000", path=None):
+    """Rasterize both captions once into a transparent RGBA layer of ``size``.
+
+    The glyphs are drawn into two masks (the stroked outline and the fill) and
+    the colours painted through them, so the layer has clean alpha edges to
+    composite onto any frame.
+    """
+    path = path if path is not None else find_font()
+    width, height = size
+    stroke_mask = Image.new("L", size, 0)
+    fill_mask = Image.new("L", size, 0)
+    stroke_draw, fill_draw = ImageDraw.Draw(stroke_mask), ImageDraw.Draw(fill_mask)
+    for text, bottom in ((top_text, False), (bottom_text, True)):
+        if not text:
+            continue
+        font_size, placements = layout_caption(text, path, width, height, max_size, bottom)
+        font = get_font(path, font_size)
+        for x, y, line in placements:
+            stroke_draw.text((x, y), line, fill=255, font=font,
+                             stroke_width=stroke_width(font_size), stroke_fill=255)
+            fill_draw.text((x, y), line, fill=255, font=font)
+
+    layer = Image.new("RGBA", size, ImageColor.getrgb(outline)[:3] + (0,))
+    layer.putalpha(stroke_mask)
+    layer.paste(ImageColor.getrgb(fill)[:3] + (255,), mask=fill_mask)
+    return layer
+
+
+def render_frames(image, layer):
+    """Yield every frame of ``image`` with ``layer`` composited on, one at a time"""
+    for frame in ImageSequence.Iterator(image):
+        rendered = frame.convert("RGBA")
+        rendered.alpha_composite(layer)
+        rendered.info["duration"] = frame.info.get("duration", DEFAULT_DURATION)
+        yield rendered
+
+
+class CaptionedAnimation(Image.Image):
+    """A multi-frame image whose frames come from ``render_frames`` on ``seek``.
+
+    This is the same protocol an animated file uses (``n_frames``, ``seek``,
+    ``tell``), so Pillow's GIF and WebP writers pull the captioned frames one by
+    one instead of needing a list of every rendered frame up front. Only the
+    current source frame and its rendered copy are held at a time.
+    """
+
+    def __init__(self, source, layer):
+        super().__init__()
+        self.source = source
+        self.layer = layer
+        self.n_frames = getattr(source, "n_frames", 1)
+        self.is_animated = self.n_frames > 1
+        self._frames = None
+        self._frame = None
+        self.seek(0)
+
+    def seek(self, frame):
+        if not 0 <= frame < self.n_frames:
+            raise EOFError("no more frames")
+        if frame == self._frame:
+            return
+        # Writers read frames in order; anything else starts the generator over
+        if self._frames is None or self._frame is None or frame < self._frame:
+            self._frames = render_frames(self.source, self.layer)
+            self._frame = -1
+        while self._frame < frame:
+            rendered = next(self._frames)
+            self._frame += 1
+        # Adopt the rendered frame, as Image._new does for a new image
+        self.im = rendered.im
+        self._mode = rendered.mode
+        self._size = rendered.size
+        self.info = rendered.info
+
+    def tell(self):
+        return self._frame
+
+
+def frame_durations(image):
+    durations = []
+    for frame in ImageSequence.Iterator(image):
+        # WebP only fills in the duration once the frame is loaded
+        frame.load()
+        durations.append(frame.info.get("duration", DEFAULT_DURATION))
+    return durations
+
+
+def save_animation(image, fp, top_text, bottom_text, max_size=60, fill="#FFFFFF", outline="#000000",
+                   image_format=None):
+    """Caption every frame of an animated GIF/WebP and write it to ``fp``.
+
+    The caption layer is rasterized once and composited onto each frame as the
+    writer asks for it. Returns the format written (the input format by default).
+    """
+    image_format = (image_format or image.format or "GIF").upper()
+    if image_format not in ANIMATED_FORMATS:
+        raise ValueError(f"Unsupported animation format {image_format}")
+    layer = caption_layer(image.size, top_text, bottom_text, max_size, fill, outline)
+    animation = CaptionedAnimation(image, layer)
+    options = {"save_all": True, "loop": image.info.get("loop", 0)}
+    if image_format == "WEBP":
+        # The WebP writer only reads the first frame's duration; GIF reads each frame's
+        options["duration"] = frame_durations(image)
+    animation.save(fp, format=image_format, **options)
+    return image_format
+
+
+def animation_bytes(image, top_text, bottom_text, max_size=60, fill="#FFFFFF", outline="#000000"):
+    buffer = io.BytesIO()
+    image_format = save_animation(image, buffer, top_text, bottom_text, max_size, fill, outline)
+    return buffer.getvalue(), image_format
@@ -0,0 +1,212 @@
+"""Render memes in bulk from a CSV of captions.
+
+    python meme_batch.py captions.csv out/ --format jpeg --workers 8
+    python meme_batch.py captions.csv memes.zip
+    python meme_batch.py captions.csv - > memes.zip
+
+The CSV needs an ``image`` column (path to the template, relative to the CSV)
+and ``top`` / ``bottom`` caption columns; an optional ``name`` column sets the
+output file name. Rows that fail are reported and skipped, the run carries on.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from itertools import islice
+
+from PIL import Image
+
+from meme_layout import render_meme
+
+# format -> (PIL format, file extension, save options)
+FORMATS = {
+    "png": ("PNG", "png", {}),
+    "jpeg": ("JPEG", "jpg", {"quality": 90}),
+    "webp": ("WEBP", "webp", {"quality": 90}),
+}
+
+# Rows sent to a worker at once; rows sharing a template within a chunk are
+# rendered back to back from the same decoded image
+CHUNK_SIZE = 32
+
+
+@lru_cache(maxsize=16)
+def load_template(path, mtime):
+    """Decoded template, cached per worker process (``mtime`` invalidates edits)"""
+    with Image.open(path) as image:
+        image.load()
+        return image if image.mode in ("RGB", "RGBA") else image.convert("RGB")
+
+
+def output_name(row_number, row, extension, used):
+    """File name for a row: its ``name`` column, or the row number. A name already
+    in ``used`` gets the row number appended so no meme overwrites another."""
+    name = (row.get("name") or "").strip()
+    stem = os.path.splitext(os.path.basename(name))[0] if name else f"meme_{row_number:06d}"
+    name, copy = f"{stem}.{extension}", 1
+    while name in used:
+        name = f"{stem}_row{row_number}.{extension}" if copy == 1 else f"{stem}_row{row_number}_{copy}.{extension}"
+        copy += 1
+    used.add(name)
+    return name
+
+
+def render_row(row, base_dir, image_format, max_font_size, color, outline):
+    path = os.path.join(base_dir, row["image"])
+    template = load_template(path, os.path.getmtime(path))
+    meme = render_meme(template, row.get("top") or "", row.get("bottom") or "", max_font_size, color, outline)
+    pil_format, _, options = FORMATS[image_format]
+    if pil_format == "JPEG" and meme.mode != "RGB":
+        meme = meme.convert("RGB")
+    buffer = io.BytesIO()
+    meme.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_chunk(rows, base_dir, output_dir, image_format, max_font_size, color, outline):
+    """Render a chunk of ``(row_number, name, row)`` in a worker process.
+
+    With an ``output_dir`` each meme is written there (atomically) and only its
+    name comes back; otherwise the encoded bytes come back for the ZIP writer.
+    Returns ``(row_number, name, data_or_None, error_or_None)`` per row.
+    """
+    results = []
+    # Same template back to back, so each one is decoded once per chunk at most
+    for row_number, name, row in sorted(rows, key=lambda item: item[2].get("image") or ""):
+        try:
+            if not row.get("image"):
+                raise ValueError("no image given")
+            data = render_row(row, base_dir, image_format, max_font_size, color, outline)
+            if output_dir:
+                out_path = os.path.join(output_dir, name)
+                with open(f"{out_path}.part", "wb") as f:
+                    f.write(data)
+                os.replace(f"{out_path}.part", out_path)
+                data = None
+            results.append((row_number, name, data, None))
+        except Exception as e:
+            results.append((row_number, name, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def read_chunks(csv_file, extension, size=CHUNK_SIZE):
+    """Stream ``[(row_number, name, row), ...]`` chunks without loading the whole CSV.
+
+    Output names are given out here, in the one process that sees every row.
+    """
+    reader = csv.DictReader(csv_file)
+    if not reader.fieldnames or "image" not in reader.fieldnames:
+        raise ValueError("CSV needs an 'image' column")
+    used = set()
+    rows = ((row_number, output_name(row_number, row, extension, used), row)
+            for row_number, row in enumerate(reader, start=1))
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(csv_path, output, image_format="png", max_font_size=60, color="#FFFFFF", outline="#000000",
+        workers=None, log=print):
+    """Render every row of ``csv_path`` into a directory, a ``.zip`` file or ``-`` (ZIP on stdout).
+
+    Returns a summary dict; failed rows are listed in ``summary["failures"]``.
+    """
+    base_dir = os.path.dirname(os.path.abspath(csv_path))
+    to_zip = output == "-" or output.lower().endswith(".zip")
+    output_dir = None if to_zip else output
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count()
+    max_in_flight = 2 * workers
+    done = 0
+    failures = []
+    start = time.perf_counter()
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as csv_file, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        zip_target = None
+        if to_zip:
+            zip_target = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            # PNG/JPEG/WebP are already compressed, so entries are stored. ZipFile
+            # writes each entry as it arrives, even to an unseekable stdout.
+            zip_file = zipfile.ZipFile(zip_target, "w", zipfile.ZIP_STORED) if to_zip else None
+            chunks = read_chunks(csv_file, FORMATS[image_format][1])
+            pending = set()
+            # Only a bounded number of chunks is in flight, so memory stays flat
+            while True:
+                for chunk in chunks:
+                    pending.add(pool.submit(render_chunk, chunk, base_dir, output_dir, image_format,
+                                            max_font_size, color, outline))
+                    if len(pending) >= max_in_flight:
+                        break
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    for row_number, name, data, error in future.result():
+                        if error:
+                            failures.append((row_number, error))
+                            log(f"FAILED row {row_number}: {error}")
+                            continue
+                        if zip_file:
+                            zip_file.writestr(name, data)
+                        done += 1
+                        if done % 500 == 0:
+                            log(f"{done} memes, {done / (time.perf_counter() - start):.1f} rows/sec")
+            if zip_file:
+                zip_file.close()
+        finally:
+            if zip_target is not None and zip_target is not sys.stdout.buffer:
+                zip_target.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rendered": done,
+        "failed": len(failures),
+        "failures": sorted(failures),
+        "seconds": elapsed,
+        "rows_per_sec": (done + len(failures)) / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="CSV with image, top and bottom columns")
+    parser.add_argument("output", help="output directory, .zip file, or - for a ZIP on stdout")
+    parser.add_argument("--format", default="png", choices=list(FORMATS))
+    parser.add_argument("--max-font-size", type=int, default=60)
+    parser.add_argument("--color", default="#FFFFFF", help="text colour")
+    parser.add_argument("--outline", default="#000000", help="outline colour")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--errors", help="also write the failed rows to this CSV")
+    args = parser.parse_args(argv)
+
+    # Progress goes to stderr so a ZIP on stdout stays clean
+    log = lambda message: print(message, file=sys.stderr)
+    try:
+        summary = run(args.csv, args.output, args.format, args.max_font_size, args.color, args.outline,
+                      args.workers, log)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.errors:
+        with open(args.errors, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["row", "error"])
+            writer.writerows(summary["failures"])
+    log(f"Rendered {summary['rendered']} memes ({summary['failed']} failed) in {summary['seconds']:.1f} s: "
+        f"{summary['rows_per_sec']:.1f} rows/sec")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import glob
+import os
+from functools import lru_cache
+
+from PIL import ImageFont
+
+# Tried in order; bare names are looked up by FreeType in the usual font folders
+FONT_CANDIDATES = [
+    "arial.ttf",
+    "Arial.ttf",
+    "impact.ttf",
+    "DejaVuSans-Bold.ttf",
+    "DejaVuSans.ttf",
+    "LiberationSans-Bold.ttf",
+    "LiberationSans-Regular.ttf",
+    "Helvetica.ttc",
+]
+
+# Where to look for any TrueType font if none of the candidates load
+FONT_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+]
+
+
+def _loads(path):
+    try:
+        ImageFont.truetype(path, 10)
+        return True
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=1)
+def find_font():
+    """Path of the first usable TrueType font, or None to use Pillow's built-in font.
+
+    Runs once per process; every rerun and every session reuses the result.
+    """
+    for candidate in FONT_CANDIDATES:
+        if _loads(candidate):
+            return candidate
+    for directory in FONT_DIRS:
+        for path in sorted(glob.glob(os.path.join(directory, "**", "*.tt[fc]"), recursive=True)):
+            if _loads(path):
+                return path
+    return None
+
+
+@lru_cache(maxsize=128)
+def get_font(path, size):
+    """Process-wide cache of loaded fonts, keyed on (font path, size)"""
+    if path is None:
+        return ImageFont.load_default(size)
+    return ImageFont.truetype(path, size)
@@ -0,0 +1,163 @@
+from functools import lru_cache
+
+from PIL import ImageDraw
+
+from meme_fonts import find_font, get_font
+
+MIN_FONT_SIZE = 10
+# Share of the image height each caption may use
+CAPTION_HEIGHT = 0.3
+# Gap to the image border, as a share of the smaller side
+MARGIN = 0.03
+LINE_SPACING = 1.1
+
+
+def stroke_width(size):
+    return max(1, size // 15)
+
+
+# Word widths are measured once at this size and scaled for the search
+REFERENCE_SIZE = 100
+
+
+@lru_cache(maxsize=4096)
+def word_width(word, path, size):
+    return get_font(path, size).getlength(word)
+
+
+def scaled_width(word, path, size):
+    """Estimated width from the cached reference measurement; glyph advances
+    scale almost linearly with the font size"""
+    return word_width(word, path, REFERENCE_SIZE) * size / REFERENCE_SIZE
+
+
+@lru_cache(maxsize=256)
+def line_height(path, size):
+    """Distance between baselines of two wrapped lines"""
+    ascent, descent = get_font(path, size).getmetrics()
+    return round((ascent + descent) * LINE_SPACING)
+
+
+def wrap_words(words, path, size, max_width, measure=word_width):
+    """Greedy word wrap into ``[(line, width), ...]``, or None if one word is too wide.
+
+    Line widths are summed from the (cached) width of every word, so whole lines
+    are never re-measured.
+    """
+    space = measure(" ", path, size)
+    lines = []
+    current, current_width = [], 0
+    for word in words:
+        width = measure(word, path, size)
+        if width > max_width:
+            return None
+        if current and current_width + space + width > max_width:
+            lines.append((" ".join(current), current_width))
+            current, current_width = [], 0
+        current_width += (space if current else 0) + width
+        current.append(word)
+    if current:
+        lines.append((" ".join(current), current_width))
+    return lines
+
+
+def break_word(word, path, size, max_width):
+    """Split a word wider than ``max_width`` into pieces that each fit"""
+    pieces, current = [], ""
+    for char in word:
+        if current and word_width(current + char, path, size) > max_width:
+            pieces.append(current)
+            current = ""
+        current += char
+    return pieces + [current]
+
+
+def _fits(words, path, size, max_width, max_height, measure=word_width):
+    inner_width = max_width - 2 * stroke_width(size)
+    lines = wrap_words(words, path, size, inner_width, measure)
+    if lines is None or len(lines) * line_height(path, size) > max_height:
+        return None
+    return lines
+
+
+@lru_cache(maxsize=512)
+def fit_caption(text, path, max_width, max_height, max_size):
+    """Largest font size (and its wrapped lines) that fits the box.
+
+    The fit is monotonic in the font size, so a binary search over the scaled
+    reference widths finds the size in about log2(max_size) cheap tries. Only
+    that size (and, rarely, the one or two below it) is then measured exactly.
+    """
+    words = tuple(text.split())
+    if not words:
+        return max_size, []
+    low, high = MIN_FONT_SIZE, max_size
+    size = MIN_FONT_SIZE
+    while low <= high:
+        middle = (low + high) // 2
+        if _fits(words, path, middle, max_width, max_height, scaled_width) is None:
+            high = middle - 1
+        else:
+            size = middle
+            low = middle + 1
+    while True:
+        lines = _fits(words, path, size, max_width, max_height)
+        if lines is not None:
+            return size, lines
+        if size == MIN_FONT_SIZE:
+            # Nothing fits even at the minimum size: still wrap to the image width
+            # (breaking words too long for a line) and only let the height overflow.
+            # On a tiny image a line still holds at least one character.
+            widest_char = max(word_width(char, path, size) for char in set("".join(words)))
+            inner_width = max(max_width - 2 * stroke_width(size), widest_char)
+            pieces = [piece for word in words for piece in
+                      (break_word(word, path, size, inner_width)
+                       if word_width(word, path, size) > inner_width else [word])]
+            return size, wrap_words(pieces, path, size, inner_width)
+        size -= 1
+
+
+def layout_caption(text, path, width, height, max_size, bottom=False):
+    """Place one caption; returns the font size and ``(x, y, line)`` for each line.
+
+    The top caption starts one margin below the top edge. The bottom caption is
+    stacked upwards from the bottom margin using the measured line height, so it
+    stays inside the image at any size.
+    """
+    margin = round(min(width, height) * MARGIN)
+    size, lines = fit_caption(text, path, width - 2 * margin, round(height * CAPTION_HEIGHT), max_size)
+    step = line_height(path, size)
+    ascent, descent = get_font(path, size).getmetrics()
+    if bottom:
+        # The last line's descent ends at the bottom margin
+        y = height - margin - stroke_width(size) - descent - ascent - step * (len(lines) - 1)
+    else:
+        y = margin + stroke_width(size)
+    placements = []
+    for line, line_width in lines:
+        x = (width - line_width) / 2
+        placements.append((x, y, line))
+        y += step
+    return size, placements
+
+
+def draw_caption(draw, text, path, width, height, max_size, fill, outline="#000000", bottom=False):
+    """Auto-fit ``text`` and draw it with an outline stroke"""
+    size, placements = layout_caption(text, path, width, height, max_size, bottom)
+    font = get_font(path, size)
+    for x, y, line in placements:
+        draw.text((x, y), line, fill=fill, font=font, stroke_width=stroke_width(size), stroke_fill=outline)
+    return size
+
+
+def render_meme(image, top_text, bottom_text, max_size=60, fill="#FFFFFF", outline="#000000", path=None):
+    """Return a copy of ``image`` with both captions auto-fitted and drawn"""
+    path = path if path is not None else find_font()
+    image = image.copy() if image.mode in ("RGB", "RGBA") else image.convert("RGB")
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+    if top_text:
+        draw_caption(draw, top_text, path, width, height, max_size, fill, outline)
+    if bottom_text:
+        draw_caption(draw, bottom_text, path, width, height, max_size, fill, outline, bottom=True)
+    return image
@@ -0,0 +1,338 @@
+"""Benchmarks for the pencil-sketch pipeline.
+
+"suite" times every stage on synthetic images: the sketch core (whole image
+and tiled), each fast blur mode (with its error against the exact sketch),
+each option of the "Filter" selectbox, the watermark, every collage layout and
+the ZIP export in each format. It writes a JSON report that can be compared
+against a report from another commit.
+
+"compare" runs the original PIL <-> NumPy round-trip code from the Streamlit
+app ("legacy") against the uint8 pipeline in sketch_engine ("array") and checks
+that both give identical output.
+
+Every measurement runs in a fresh process so peak RSS is not polluted by
+earlier runs.
+
+    python benchmark.py suite --sizes 1 12 24 50 --json report.json
+    python benchmark.py suite --sizes 12 --json new.json --baseline report.json
+    python benchmark.py compare --sizes 1 12 --filters None Sepia Colorize
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageDraw, ImageFont, ImageFilter, ImageOps
+
+from sketch_collage import LAYOUTS, compose_collage
+from sketch_engine import (
+    BLUR_MODES, FILTERS, add_watermark, apply_filters, pencil_sketch, pencil_sketch_tiled, process_image,
+)
+from sketch_export import EXPORT_FORMATS, write_zip
+
+IMPLEMENTATIONS = ["legacy", "array"]
+
+
+def synthetic_image(megapixels, seed=0):
+    """Deterministic photo-like 4:3 test image: smooth gradients plus noise.
+
+    Built in bands of rows so generating a 50 MP image does not itself push the
+    peak RSS far above the size of the image.
+    """
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    rng = np.random.default_rng(seed)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    x = np.arange(width, dtype=np.float32)
+    for y0 in range(0, height, 256):
+        y = np.arange(y0, min(y0 + 256, height), dtype=np.float32)[:, None]
+        noise = rng.normal(0, 20, size=(len(y), width)).astype(np.float32)
+        pixels[y0:y0 + len(y), :, 0] = np.clip(x / width * 200 + noise, 0, 255)
+        pixels[y0:y0 + len(y), :, 1] = np.clip(y / height * 200 + noise, 0, 255)
+        pixels[y0:y0 + len(y), :, 2] = np.clip((x + y) / (width + height) * 200 + noise, 0, 255)
+    return Image.fromarray(pixels)
+
+
+def legacy_sketch(image, params):
+    """The original per-image code from pencil_sketch_app.py, kept as the reference"""
+    img_cv = np.array(image.convert('RGB'))
+    img_cv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2BGR)
+    gray_image = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+    inverted_image = 255 - gray_image
+    blurred = cv2.GaussianBlur(inverted_image, (21, 21), sigmaX=0, sigmaY=0)
+    inverted_blurred = 255 - blurred
+    sketch = cv2.divide(gray_image, inverted_blurred, scale=256.0)
+    sketch_pil = Image.fromarray(sketch).convert("RGB")
+
+    sketch_pil = ImageEnhance.Brightness(sketch_pil).enhance(params["brightness"])
+    sketch_pil = ImageEnhance.Contrast(sketch_pil).enhance(params["contrast"])
+
+    filter_type = params["filter"]
+    if filter_type == "Sepia":
+        sepia = np.array(sketch_pil)
+        sepia = cv2.transform(sepia, np.matrix([[0.393, 0.769, 0.189],
+                                               [0.349, 0.686, 0.168],
+                                               [0.272, 0.534, 0.131]]))
+        sepia = np.clip(sepia, 0, 255)
+        sketch_pil = Image.fromarray(sepia.astype('uint8'))
+    elif filter_type == "Black & White":
+        bw = np.array(sketch_pil.convert('L'))
+        sketch_pil = Image.fromarray(bw).convert('RGB')
+    elif filter_type == "Blur":
+        sketch_pil = sketch_pil.filter(ImageFilter.GaussianBlur(radius=3))
+    elif filter_type == "Sharpen":
+        sketch_pil = sketch_pil.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+    elif filter_type == "Emboss":
+        sketch_pil = sketch_pil.filter(ImageFilter.EMBOSS)
+    elif filter_type == "Edge Enhance":
+        sketch_pil = sketch_pil.filter(ImageFilter.EDGE_ENHANCE)
+    elif filter_type == "Colorize":
+        color = params["color"]
+        r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+        sketch_pil = ImageOps.colorize(sketch_pil.convert("L"), (r, g, b), (255, 255, 255))
+
+    if params["watermark"]:
+        draw = ImageDraw.Draw(sketch_pil)
+        font = ImageFont.load_default()
+        text_bbox = draw.textbbox((0, 0), params["watermark"], font=font)
+        x = sketch_pil.width - (text_bbox[2] - text_bbox[0]) - 10
+        y = sketch_pil.height - (text_bbox[3] - text_bbox[1]) - 10
+        draw.text((x, y), params["watermark"], fill="white", font=font)
+    return sketch_pil
+
+
+def array_sketch(image, params):
+    return process_image(image, params)[1]
+
+
+def bench_params(filter_type):
+    return {"brightness": 1.2, "contrast": 1.3, "filter": filter_type,
+            "color": "#FF5733", "watermark": "benchmark", "tile_budget": None}
+
+
+def as_rgb(result):
+    """Normalise either implementation's output to an RGB array for comparison"""
+    array = np.asarray(result)
+    return cv2.cvtColor(array, cv2.COLOR_GRAY2RGB) if array.ndim == 2 else array
+
+
+def measure(fn, repeat):
+    """Time ``fn`` and record how much memory it needed on top of what is already live"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "seconds": min(times),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_growth_mb": (rss_after - rss_before) / 1024,
+        # Python and NumPy allocations only; PIL and OpenCV internals are not traced
+        "numpy_peak_alloc_mb": traced_peak / 2**20,
+    }
+
+
+# Number of sketches in the collage and ZIP cases
+BATCH_SIZE = 4
+
+
+def suite_cases():
+    return (["sketch", "sketch_tiled", "watermark"]
+            + [f"blur:{name}" for name in BLUR_MODES[1:]]
+            + [f"filter:{name}" for name in FILTERS]
+            + [f"collage:{name}" for name in LAYOUTS]
+            + [f"zip:{name}" for name in EXPORT_FORMATS])
+
+
+def sketch_error(sketch, exact):
+    """How far an approximate sketch is from the exact one, in gray levels"""
+    diff = cv2.absdiff(sketch, exact)
+    return {"mean_abs_error": float(diff.mean()), "max_abs_error": int(diff.max()),
+            "psnr_db": float(cv2.PSNR(sketch, exact))}
+
+
+def suite_case(case, megapixels, repeat):
+    """Set up one suite case in this process, then measure only the stage itself"""
+    image = synthetic_image(megapixels)
+    image.load()
+    mp = image.width * image.height / 1e6
+    kind, _, name = case.partition(":")
+    if kind == "sketch":
+        fn = lambda: pencil_sketch(image)
+    elif kind == "sketch_tiled":
+        fn = lambda: pencil_sketch_tiled(image, 64 * 2**20)
+    elif kind == "blur":
+        error = sketch_error(pencil_sketch(image, mode=name), pencil_sketch(image))
+        return {"case": case, "megapixels": round(mp, 2),
+                **measure(lambda: pencil_sketch(image, mode=name), repeat), **error}
+    else:
+        sketch = pencil_sketch(image)
+        del image
+        if kind == "watermark":
+            fn = lambda: add_watermark(sketch.copy(), "benchmark")
+        elif kind == "filter":
+            fn = lambda: apply_filters(sketch, bench_params(name))
+        elif kind == "collage":
+            fn = lambda: compose_collage([sketch] * BATCH_SIZE, name, cols=2, text="benchmark")
+        elif kind == "zip":
+            def fn():
+                with open(os.devnull, "wb") as f:
+                    write_zip(f, ((f"sketch_{i}", sketch) for i in range(BATCH_SIZE)), name)
+        else:
+            raise ValueError(f"Unknown benchmark case: {case}")
+    return {"case": case, "megapixels": round(mp, 2), **measure(fn, repeat)}
+
+
+def legacy_case(implementation, megapixels, filter_type, repeat):
+    """Run one implementation of the compare benchmark in this process"""
+    image = synthetic_image(megapixels)
+    image.load()
+    mp = image.width * image.height / 1e6
+    params = bench_params(filter_type)
+    fn = legacy_sketch if implementation == "legacy" else array_sketch
+    result = measure(lambda: fn(image, params), repeat)
+    return {"implementation": implementation, "megapixels": round(mp, 2), "filter": filter_type,
+            **result, "seconds_per_mp": result["seconds"] / mp}
+
+
+def run_child(*args):
+    output = subprocess.check_output([sys.executable, __file__, "child", *map(str, args)])
+    return json.loads(output)
+
+
+def check_identical(filter_type):
+    image = synthetic_image(0.5)
+    params = bench_params(filter_type)
+    return bool(np.array_equal(as_rgb(legacy_sketch(image, params)), as_rgb(array_sketch(image, params))))
+
+
+def environment():
+    """What the numbers depend on, so reports from different machines are not mixed up"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pillow": Image.__version__,
+    }
+
+
+def compare_reports(baseline, results, threshold):
+    """Print the change per case against a baseline report; returns the regressed cases"""
+    old = {(row["case"], row["megapixels"]): row for row in baseline["results"]}
+    regressions = []
+    for row in results:
+        before = old.get((row["case"], row["megapixels"]))
+        if before is None:
+            continue
+        change = row["seconds"] / before["seconds"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        if flag:
+            regressions.append(row["case"])
+        print(f"{row['case']:<24} {row['megapixels']:>6.1f} MP  {before['seconds'] * 1000:9.1f} -> "
+              f"{row['seconds'] * 1000:9.1f} ms  {change:+7.1%}  {flag}")
+    return regressions
+
+
+def run_suite(args):
+    cases = args.cases or suite_cases()
+    results = []
+    for megapixels in args.sizes:
+        for case in cases:
+            row = run_child("suite", case, megapixels, args.repeat)
+            results.append(row)
+            error = f"  error {row['mean_abs_error']:.3f} avg, PSNR {row['psnr_db']:.1f} dB" if "psnr_db" in row else ""
+            print(f"{row['case']:<24} {row['megapixels']:>6.1f} MP  {row['seconds'] * 1000:9.1f} ms  "
+                  f"RSS +{row['peak_rss_growth_mb']:7.1f} MB  numpy peak {row['numpy_peak_alloc_mb']:7.1f} MB{error}")
+
+    report = {"environment": environment(), "repeat": args.repeat, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.baseline} ({baseline['environment'].get('commit')}):")
+        if compare_reports(baseline, results, args.threshold):
+            return 1
+    return 0
+
+
+def run_compare(args):
+    rows = []
+    for filter_type in args.filters:
+        identical = check_identical(filter_type)
+        for megapixels in args.sizes:
+            for implementation in IMPLEMENTATIONS:
+                row = run_child("compare", implementation, megapixels, filter_type, args.repeat)
+                row["identical"] = identical
+                rows.append(row)
+                print(f"{row['filter']:<13} {row['megapixels']:>6.1f} MP  {implementation:<6} "
+                      f"{row['seconds_per_mp'] * 1000:8.1f} ms/MP  "
+                      f"RSS +{row['peak_rss_growth_mb']:7.1f} MB  "
+                      f"numpy peak {row['numpy_peak_alloc_mb']:7.1f} MB  "
+                      f"identical={identical}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"environment": environment(), "repeat": args.repeat, "results": rows}, f, indent=2)
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "child":
+        # Internal: one measurement in a fresh process, printed as JSON
+        mode, *rest = sys.argv[2:]
+        if mode == "suite":
+            case, megapixels, repeat = rest
+            print(json.dumps(suite_case(case, float(megapixels), int(repeat))))
+        else:
+            implementation, megapixels, filter_type, repeat = rest
+            print(json.dumps(legacy_case(implementation, float(megapixels), filter_type, int(repeat))))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    suite = commands.add_parser("suite", help="time every stage and write a report")
+    suite.add_argument("--sizes", type=float, nargs="+", default=[1, 12, 24, 50])
+    suite.add_argument("--cases", nargs="+", choices=suite_cases(), help="only run these cases")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--json", help="write the report to this file")
+    suite.add_argument("--baseline", help="report from another commit to compare against")
+    suite.add_argument("--threshold", type=float, default=0.10,
+                       help="slowdown that counts as a regression (default: 0.10 = 10%%)")
+
+    compare = commands.add_parser("compare", help="original PIL code against the uint8 pipeline")
+    compare.add_argument("--sizes", type=float, nargs="+", default=[1, 12])
+    compare.add_argument("--filters", nargs="+", default=FILTERS, choices=FILTERS)
+    compare.add_argument("--repeat", type=int, default=3)
+    compare.add_argument("--json", help="write the results to this file")
+
+    args = parser.parse_args()
+    return run_suite(args) if args.command == "suite" else run_compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
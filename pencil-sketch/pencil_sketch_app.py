@@ -1,9 +1,16 @@
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image, ImageEnhance, ImageDraw, ImageFont, ImageFilter, ImageOps
-import zipfile
+from PIL import Image
 import io
+import os
+import tempfile
+
+from sketch_cache import SketchCache, content_hash, params_key
+from sketch_engine import BLUR_MODES, DEFAULT_PARAMS, FILTERS
+from sketch_collage import LAYOUTS, compose_collage
+from sketch_export import EXPORT_FORMATS, encode_image, write_zip
+from sketch_pipeline import SketchPipeline, proxy_params
+from sketch_store import SessionImageStore, SessionVideoFile
+from sketch_video import preview_frames, sketch_video
 
 # Custom CSS for Enhanced UI & Animation
 st.markdown("""
@@ -67,208 +74,291 @@ if theme == "Dark":
         </style>
         """, unsafe_allow_html=True)
 
+
+@st.cache_resource
+def get_pipeline():
+    # Shared by every session and kept across reruns; stage outputs are content addressed
+    return SketchPipeline(SketchCache(max_bytes=512 * 1024 * 1024))
+
+
+pipeline = get_pipeline()
+
+
+def get_session_store():
+    # Sketches this session needs for the collage and ZIP; spills to disk over budget
+    if "image_store" not in st.session_state:
+        st.session_state.image_store = SessionImageStore()
+    return st.session_state.image_store
+
+
+def get_session_video():
+    # The uploaded video as a file in this session's temp directory, removed with the session
+    if "video_file" not in st.session_state:
+        st.session_state.video_file = SessionVideoFile()
+    return st.session_state.video_file
+
+
+def decode_image(data):
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+# Large scans are sketched tile by tile so they never need several full-size copies
+st.sidebar.header("Performance")
+tiled_enabled = st.sidebar.checkbox("Tiled processing for large images", value=True)
+tile_budget_mb = st.sidebar.slider("Sketch memory budget (MB)", 16, 1024, 128, disabled=not tiled_enabled)
+
+# Sliders only re-render a downscaled proxy; full resolution is rendered on download
+fast_previews = st.sidebar.checkbox("Fast previews (proxy resolution)", value=True)
+preview_size = st.sidebar.slider("Preview size (px)", 512, 2048, 1024, step=256, disabled=not fast_previews)
+
+# Sketches kept for the collage and ZIP beyond this are paged out to temp files
+session_budget_mb = st.sidebar.slider("Session memory budget (MB)", 64, 2048, 256, step=64)
+store = get_session_store()
+store.set_budget(session_budget_mb * 2**20)
+
+# Speed/quality trade-off of the sketch blur; "Exact" keeps the original output
+blur_mode = st.sidebar.selectbox("Sketch quality", BLUR_MODES,
+                                 help="Box cascade and Half resolution differ from Exact by about "
+                                      "0.15 gray levels on average (PSNR ~51 dB); Integral image by "
+                                      "about 0.9 (PSNR ~42 dB)")
+
 # Multiple Image Upload
 uploaded_files = st.file_uploader("Upload Images", type=['jpg', 'jpeg', 'png'], accept_multiple_files=True)
 
 if uploaded_files:
-    images = []
-    sketches = []
+    sketch_keys = []
+    jobs = []
+    preview_jobs = []
+    # Decoded uploads for this run; the cache may have evicted them (or never kept
+    # one bigger than its budget), so they are handed to the pipeline directly
+    sources = {}
 
     # Add image preview in sidebar
     st.sidebar.header("Uploaded Images")
     for uploaded_file in uploaded_files:
-        st.sidebar.image(Image.open(uploaded_file), caption=uploaded_file.name, width=100)
+        st.sidebar.image(uploaded_file.getvalue(), caption=uploaded_file.name, width=100)
+
+    # Collect the options for each uploaded image
+    for uploaded_file in uploaded_files:
+        data = uploaded_file.getvalue()
+        digest = content_hash(data)
+        image = sources[digest] = pipeline.load_source(digest, lambda: decode_image(data))
+        source_size = image.size
+        params = dict(DEFAULT_PARAMS)
+
+        def preview(params):
+            return proxy_params(params, source_size, preview_size) if fast_previews else params
+
+        # Add cropping option
+        st.sidebar.header(f"Crop Image - {uploaded_file.name}")
+        crop_enabled = st.sidebar.checkbox(f"Enable Cropping for {uploaded_file.name}", key=f"crop_{uploaded_file.name}")
+        if crop_enabled:
+            left = st.sidebar.slider("Left", 0, image.width, 0, key=f"left_{uploaded_file.name}")
+            top = st.sidebar.slider("Top", 0, image.height, 0, key=f"top_{uploaded_file.name}")
+            right = st.sidebar.slider("Right", 0, image.width, image.width, key=f"right_{uploaded_file.name}")
+            bottom = st.sidebar.slider("Bottom", 0, image.height, image.height, key=f"bottom_{uploaded_file.name}")
+            params["crop"] = (left, top, right, bottom)
+            image = pipeline.run(digest, preview(params), ("crop",), sources[digest])["crop"]
+            st.image(image, caption='Cropped Image', use_container_width=True)
+
+        # Add rotation option
+        st.sidebar.header(f"Rotate Image - {uploaded_file.name}")
+        rotate_angle = st.sidebar.slider("Rotation Angle", -180, 180, 0, key=f"rotate_{uploaded_file.name}")
+        if rotate_angle != 0:
+            params["rotate"] = rotate_angle
+            image = pipeline.run(digest, preview(params), ("rotate",), sources[digest])["rotate"]
+            st.image(image, caption='Rotated Image', use_container_width=True)
+
+        # Add resizing option
+        st.sidebar.header(f"Resize Image - {uploaded_file.name}")
+        resize_enabled = st.sidebar.checkbox(f"Enable Resizing for {uploaded_file.name}", key=f"resize_{uploaded_file.name}")
+        if resize_enabled:
+            # Slider defaults are in full-resolution pixels even when the preview is a proxy
+            scale = preview(params)["proxy_scale"]
+            full_width, full_height = round(image.width / scale), round(image.height / scale)
+            new_width = st.sidebar.slider("Width", 100, 2000, min(max(full_width, 100), 2000), key=f"width_{uploaded_file.name}")
+            new_height = st.sidebar.slider("Height", 100, 2000, min(max(full_height, 100), 2000), key=f"height_{uploaded_file.name}")
+            params["resize"] = (new_width, new_height)
+            image = pipeline.run(digest, preview(params), ("resize",), sources[digest])["resize"]
+            st.image(image, caption='Resized Image', use_container_width=True)
+
+        # Filters: Brightness, Contrast, Blur, Sharpen
+        st.sidebar.header(f"Adjust Filters for {uploaded_file.name}")
+        params["brightness"] = st.sidebar.slider("Brightness", 0.5, 2.0, 1.0, key=f"brightness_{uploaded_file.name}")
+        params["contrast"] = st.sidebar.slider("Contrast", 0.5, 2.0, 1.0, key=f"contrast_{uploaded_file.name}")
+        params["filter"] = st.sidebar.selectbox("Filter", FILTERS, key=f"filter_{uploaded_file.name}")
+        if params["filter"] == "Colorize":
+            params["color"] = st.sidebar.color_picker("Choose Color", "#FF5733", key=f"color_{uploaded_file.name}")
+
+        # Add watermark option
+        st.sidebar.header(f"Add Watermark - {uploaded_file.name}")
+        params["watermark"] = st.sidebar.text_input("Watermark Text", key=f"watermark_{uploaded_file.name}")
+
+        params["tile_budget"] = tile_budget_mb * 2**20 if tiled_enabled else None
+        params["blur_mode"] = blur_mode
+        jobs.append((digest, params))
+        preview_jobs.append((digest, preview(params)))
 
     # Add progress bar
     progress_bar = st.progress(0)
 
-    # Processing Each Uploaded Image
-    for i, uploaded_file in enumerate(uploaded_files):
-        with st.spinner(f'Processing {uploaded_file.name}...'):
-            image = Image.open(uploaded_file)
-
-            # Add cropping option
-            st.sidebar.header(f"Crop Image - {uploaded_file.name}")
-            crop_enabled = st.sidebar.checkbox(f"Enable Cropping for {uploaded_file.name}", key=f"crop_{uploaded_file.name}")
-            if crop_enabled:
-                left = st.sidebar.slider("Left", 0, image.width, 0, key=f"left_{uploaded_file.name}")
-                top = st.sidebar.slider("Top", 0, image.height, 0, key=f"top_{uploaded_file.name}")
-                right = st.sidebar.slider("Right", 0, image.width, image.width, key=f"right_{uploaded_file.name}")
-                bottom = st.sidebar.slider("Bottom", 0, image.height, image.height, key=f"bottom_{uploaded_file.name}")
-                image = image.crop((left, top, right, bottom))
-                st.image(image, caption='Cropped Image', use_container_width=True)
-
-            # Add rotation option
-            st.sidebar.header(f"Rotate Image - {uploaded_file.name}")
-            rotate_angle = st.sidebar.slider("Rotation Angle", -180, 180, 0, key=f"rotate_{uploaded_file.name}")
-            if rotate_angle != 0:
-                image = image.rotate(rotate_angle, expand=True)
-                st.image(image, caption='Rotated Image', use_container_width=True)
-
-            # Add resizing option
-            st.sidebar.header(f"Resize Image - {uploaded_file.name}")
-            resize_enabled = st.sidebar.checkbox(f"Enable Resizing for {uploaded_file.name}", key=f"resize_{uploaded_file.name}")
-            if resize_enabled:
-                new_width = st.sidebar.slider("Width", 100, 2000, image.width, key=f"width_{uploaded_file.name}")
-                new_height = st.sidebar.slider("Height", 100, 2000, image.height, key=f"height_{uploaded_file.name}")
-                image = image.resize((new_width, new_height))
-                st.image(image, caption='Resized Image', use_container_width=True)
-
-            # Convert PIL Image to OpenCV format
-            img_cv = np.array(image.convert('RGB'))
-            img_cv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2BGR)
-            
-            # Pencil Sketch Conversion
-            gray_image = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-            inverted_image = 255 - gray_image
-            blurred = cv2.GaussianBlur(inverted_image, (21, 21), sigmaX=0, sigmaY=0)
-            inverted_blurred = 255 - blurred
-            sketch = cv2.divide(gray_image, inverted_blurred, scale=256.0)
-            
-            # Convert Sketch to PIL Format for Filters
-            sketch_pil = Image.fromarray(sketch).convert("RGB")
-            
-            # Save Images for Collage
-            images.append(image)
-            sketches.append(sketch_pil)
-
-            # Filters: Brightness, Contrast, Blur, Sharpen
-            st.sidebar.header(f"Adjust Filters for {uploaded_file.name}")
-            brightness = st.sidebar.slider("Brightness", 0.5, 2.0, 1.0, key=f"brightness_{uploaded_file.name}")
-            contrast = st.sidebar.slider("Contrast", 0.5, 2.0, 1.0, key=f"contrast_{uploaded_file.name}")
-            filter_type = st.sidebar.selectbox("Filter", ["None", "Sepia", "Black & White", "Blur", "Sharpen", "Emboss", "Edge Enhance", "Colorize"], key=f"filter_{uploaded_file.name}")
-            
-            enhancer = ImageEnhance.Brightness(sketch_pil)
-            sketch_pil = enhancer.enhance(brightness)
-            
-            enhancer = ImageEnhance.Contrast(sketch_pil)
-            sketch_pil = enhancer.enhance(contrast)
-            
-            # Extra Filters
-            if filter_type == "Sepia":
-                sepia = np.array(sketch_pil)
-                sepia = cv2.transform(sepia, np.matrix([[0.393, 0.769, 0.189],
-                                                       [0.349, 0.686, 0.168],
-                                                       [0.272, 0.534, 0.131]]))
-                sepia = np.clip(sepia, 0, 255)
-                sketch_pil = Image.fromarray(sepia.astype('uint8'))
-            
-            elif filter_type == "Black & White":
-                bw = np.array(sketch_pil.convert('L'))
-                sketch_pil = Image.fromarray(bw).convert('RGB')
-            
-            elif filter_type == "Blur":
-                sketch_pil = sketch_pil.filter(ImageFilter.GaussianBlur(radius=3))
-            
-            elif filter_type == "Sharpen":
-                sketch_pil = sketch_pil.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
-            
-            elif filter_type == "Emboss":
-                sketch_pil = sketch_pil.filter(ImageFilter.EMBOSS)
-            
-            elif filter_type == "Edge Enhance":
-                sketch_pil = sketch_pil.filter(ImageFilter.EDGE_ENHANCE)
-            
-            elif filter_type == "Colorize":
-                color = st.sidebar.color_picker("Choose Color", "#FF5733", key=f"color_{uploaded_file.name}")
-                r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
-                sketch_pil = ImageOps.colorize(sketch_pil.convert("L"), (r, g, b), (255, 255, 255))
-            
-            # Add watermark option
-            st.sidebar.header(f"Add Watermark - {uploaded_file.name}")
-            watermark_text = st.sidebar.text_input("Watermark Text", key=f"watermark_{uploaded_file.name}")
-            if watermark_text:
-                draw = ImageDraw.Draw(sketch_pil)
-                font = ImageFont.load_default()
-                
-                # Use textbbox to get the bounding box of the text
-                text_bbox = draw.textbbox((0, 0), watermark_text, font=font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
-                
-                x = sketch_pil.width - text_width - 10
-                y = sketch_pil.height - text_height - 10
-                draw.text((x, y), watermark_text, fill="white", font=font)
-                st.image(sketch_pil, caption='Image with Watermark', use_container_width=True)
-
-            # Display Pencil Sketch with Filters Applied
-            st.image(sketch_pil, caption='Pencil Sketch (with Filters)', use_container_width=True)
-
-            # Download Option for Each Image
-            img_bytes = io.BytesIO()
-            sketch_pil.save(img_bytes, format="PNG")
-            st.download_button(f"Download Sketch - {uploaded_file.name}", data=img_bytes.getvalue(), file_name=f"sketch_{uploaded_file.name}", mime="image/png")
-
-            # Update progress bar
-            progress_bar.progress((i + 1) / len(uploaded_files))
+    # Only the stages downstream of a changed option are recomputed; the
+    # rest come from the cache. The bar moves as each image finishes.
+    with st.spinner(f'Processing {len(jobs)} images...'):
+        results = pipeline.run_batch(preview_jobs, on_progress=lambda done, total: progress_bar.progress(done / total),
+                                     sources=sources)
+    progress_bar.progress(1.0)
+
+    def full_key(digest, params):
+        return ("full", digest, params_key(params))
+
+    def full_resolution_keys():
+        """Render each full-resolution sketch once into the session store.
+
+        One image at a time, so only a single full-size sketch is in flight and
+        the store can page earlier ones out to disk.
+        """
+        if not fast_previews:
+            return sketch_keys
+        keys = []
+        for digest, params in jobs:
+            key = full_key(digest, params)
+            if key not in store:
+                store.put(key, pipeline.run(digest, params, ("divide",), sources[digest])["divide"])
+            keys.append(key)
+        return keys
+
+    stats = pipeline.cache.stats()
+    st.sidebar.caption(f"Sketch cache: {stats['hits']} hits, {stats['misses']} misses, "
+                       f"{stats['bytes'] / 2**20:.1f} / {stats['max_bytes'] / 2**20:.0f} MB")
+    with st.sidebar.expander("Stage timings"):
+        st.table([{"Stage": row["stage"], "Runs": row["runs"], "Total (ms)": round(row["seconds"] * 1000, 1),
+                   "Last (ms)": round(row["last"] * 1000, 1)} for row in pipeline.timing_report()])
+
+    for uploaded_file, (digest, params), (_, shown_params), result in zip(uploaded_files, jobs, preview_jobs, results):
+        # uint8 array; single-channel unless a colour filter expanded it
+        final = result["watermark"]
+
+        # Save Sketches for Collage; keyed by content and options like the full-resolution
+        # sketches, so an unchanged sketch is not copied (or spilled) again on every rerun
+        key = ("preview", digest, params_key(shown_params))
+        if key not in store:
+            store.put(key, result["divide"])
+        sketch_keys.append(key)
+
+        if params["watermark"]:
+            st.image(final, caption='Image with Watermark', use_container_width=True)
+
+        # Display Pencil Sketch with Filters Applied
+        st.image(final, caption='Pencil Sketch (with Filters)', use_container_width=True)
+
+        # Download Option for Each Image
+        if not fast_previews:
+            st.download_button(f"Download Sketch - {uploaded_file.name}", data=encode_image(final), file_name=f"sketch_{uploaded_file.name}", mime="image/png")
+        elif st.button(f"Prepare Full-Resolution Sketch - {uploaded_file.name}", key=f"full_{uploaded_file.name}"):
+            with st.spinner("Rendering full resolution..."):
+                full = pipeline.run(digest, params, source=sources[digest])["watermark"]
+            st.download_button(f"Download Sketch - {uploaded_file.name}", data=encode_image(full), file_name=f"sketch_{uploaded_file.name}", mime="image/png")
+
+    # Forget sketches of removed uploads and of options that have since changed
+    store.retain(sketch_keys + [full_key(digest, params) for digest, params in jobs])
+    store_stats = store.stats()
+    st.sidebar.caption(f"Session images: {store_stats['resident_bytes'] / 2**20:.1f} MB in memory, "
+                       f"{store_stats['spilled_bytes'] / 2**20:.1f} MB spilled to disk")
 
     # Collage Option
-    if len(sketches) > 1:
+    if len(sketch_keys) > 1:
         st.subheader("Create Collage")
-        cols = st.slider("Number of Columns", 1, len(sketches), 2)
-        
-        # Define widths and heights for collage
-        widths, heights = zip(*(i.size for i in sketches))
-        
+        cols = st.slider("Number of Columns", 1, len(sketch_keys), 2)
+
         # Add collage layout options
         st.subheader("Collage Layout")
-        layout = st.selectbox("Choose Layout", ["Grid", "Vertical", "Horizontal"])
-
-        if layout == "Grid":
-            total_width = max(widths) * cols
-            total_height = sum(heights) // cols
-            collage = Image.new('RGB', (total_width, total_height), (255, 255, 255))
-            x_offset = 0
-            y_offset = 0
-            for i, img in enumerate(sketches):
-                collage.paste(img, (x_offset, y_offset))
-                x_offset += img.size[0]
-                if (i + 1) % cols == 0:
-                    x_offset = 0
-                    y_offset += img.size[1]
-        elif layout == "Vertical":
-            total_width = max(widths)
-            total_height = sum(heights)
-            collage = Image.new('RGB', (total_width, total_height), (255, 255, 255))
-            y_offset = 0
-            for img in sketches:
-                collage.paste(img, (0, y_offset))
-                y_offset += img.size[1]
-        elif layout == "Horizontal":
-            total_width = sum(widths)
-            total_height = max(heights)
-            collage = Image.new('RGB', (total_width, total_height), (255, 255, 255))
-            x_offset = 0
-            for img in sketches:
-                collage.paste(img, (x_offset, 0))
-                x_offset += img.size[0]
-        
+        layout = st.selectbox("Choose Layout", LAYOUTS)
+        cell_size = st.slider("Tile Size (px)", 100, 1000, 400, step=50)
+        max_size = st.slider("Maximum Collage Size (px)", 1000, 8000, 4000, step=500)
+
         # Custom Text
         text = st.text_input("Enter Text for Collage")
-        if text:
-            draw = ImageDraw.Draw(collage)
-            font = ImageFont.load_default()
-            draw.text((10, 10), text, fill="black", font=font)
-        
+
         # Sticker
         sticker_option = st.selectbox("Add Sticker", ["None", "Star", "Heart"])
+        sticker_img = None
         if sticker_option != "None":
             sticker_img = Image.open(f"stickers/{sticker_option.lower()}.png").convert("RGBA")
-            collage.paste(sticker_img, (total_width - 100, total_height - 100), sticker_img)
-        
+
+        # Tiles are downscaled into place and the overlays drawn on the same canvas
+        collage = compose_collage([store.get(key) for key in sketch_keys], layout, cols, cell_size, max_size, text, sticker_img)
         st.image(collage, caption='Collage of Pencil Sketches', use_container_width=True)
 
         # Download Collage
-        img_bytes = io.BytesIO()
-        collage.save(img_bytes, format="PNG")
-        st.download_button("Download Collage", data=img_bytes.getvalue(), file_name="collage.png", mime="image/png")
+        if not fast_previews:
+            st.download_button("Download Collage", data=encode_image(collage), file_name="collage.png", mime="image/png")
+        elif st.button("Prepare Full-Resolution Collage"):
+            with st.spinner("Rendering full resolution..."):
+                collage = compose_collage([store.get(key) for key in full_resolution_keys()], layout, cols, cell_size, max_size, text, sticker_img)
+            st.download_button("Download Collage", data=encode_image(collage), file_name="collage.png", mime="image/png")
 
     # Add save all sketches option
+    export_format = st.selectbox("ZIP Image Format", list(EXPORT_FORMATS))
+    quality = st.slider("JPEG Quality", 50, 100, 90) if export_format == "JPEG" else 90
     if st.button("Download All Sketches as ZIP"):
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "a", zipfile.ZIP_DEFLATED, False) as zip_file:
-            for i, sketch in enumerate(sketches):
-                img_bytes = io.BytesIO()
-                sketch.save(img_bytes, format="PNG")
-                zip_file.writestr(f"sketch_{i+1}.png", img_bytes.getvalue())
-        st.download_button("Download ZIP", data=zip_buffer.getvalue(), file_name="sketches.zip", mime="application/zip")
\ No newline at end of file
+        # Entries are encoded in parallel and streamed to a temp file, so the
+        # archive is never built up in memory alongside the encoded images
+        zip_file = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+        try:
+            with zip_file, st.spinner("Building ZIP..."):
+                write_zip(zip_file, ((f"sketch_{i+1}", store.get(key)) for i, key in enumerate(full_resolution_keys())),
+                          export_format, quality)
+            # download_button takes a file opened for reading (a BufferedReader), not the
+            # read/write temp file itself
+            with open(zip_file.name, "rb") as f:
+                st.download_button("Download ZIP", data=f, file_name="sketches.zip", mime="application/zip")
+        finally:
+            os.remove(zip_file.name)
+
+# Video to Pencil Sketch
+st.header("🎬 Video to Pencil Sketch")
+uploaded_video = st.file_uploader("Upload a Video", type=["mp4", "mov", "avi", "mkv"])
+
+if uploaded_video:
+    video_params = {
+        "brightness": st.slider("Video Brightness", 0.5, 2.0, 1.0),
+        "contrast": st.slider("Video Contrast", 0.5, 2.0, 1.0),
+        "filter": st.selectbox("Video Filter", FILTERS),
+    }
+    if video_params["filter"] == "Colorize":
+        video_params["color"] = st.color_picker("Video Color", "#FF5733")
+    video_params["watermark"] = st.text_input("Video Watermark Text")
+    video_params["blur_mode"] = blur_mode
+
+    # OpenCV only reads from a path; the file is keyed on the content so reruns
+    # don't write it again, and a new upload replaces the previous one
+    data = uploaded_video.getvalue()
+    video_path = get_session_video().write(content_hash(data), data, os.path.splitext(uploaded_video.name)[1])
+
+    if st.button("Live Preview"):
+        frame_slot = st.empty()
+        status = st.empty()
+        for index, frame, skipped in preview_frames(video_path, video_params):
+            frame_slot.image(frame, caption="Sketch Preview", use_container_width=True)
+            status.caption(f"Frame {index + 1} ({skipped} frames skipped to keep up)")
+
+    if st.button("Convert to Sketch Video"):
+        video_progress = st.progress(0)
+        out_file = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False)
+        out_file.close()
+        try:
+            with st.spinner("Sketching video..."):
+                sketch_video(video_path, out_file.name, video_params,
+                             on_progress=lambda done, total: video_progress.progress(min(done / max(total, 1), 1.0)))
+            video_progress.progress(1.0)
+            with open(out_file.name, "rb") as f:
+                st.download_button("Download Sketch Video", data=f.read(),
+                                   file_name=f"sketch_{os.path.splitext(uploaded_video.name)[0]}.mp4", mime="video/mp4")
+        finally:
+            os.remove(out_file.name)
+elif "video_file" in st.session_state:
+    # The upload was removed; don't keep its copy until the session ends
+    st.session_state.video_file.discard()
@@ -0,0 +1,165 @@
+"""Sketch a directory (or glob) of images without the Streamlit UI.
+
+    python sketch_cli.py photos/ out/ --preset preset.json --workers 8
+    python sketch_cli.py "photos/**/*.jpg" out/ --format "WebP (lossless)"
+
+The preset is a JSON object with any of the per-image options from the app,
+e.g. {"filter": "Sepia", "brightness": 1.2, "watermark": "shop.example"}.
+For huge batches, {"blur_mode": "Half resolution"} trades a little accuracy
+for speed.
+Files whose output already exists are skipped, so an interrupted run can
+simply be started again.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from PIL import Image
+
+from sketch_engine import BLUR_MODES, DEFAULT_PARAMS, FILTERS, get_pool, process_image, transform_image
+from sketch_export import EXPORT_FORMATS, encode_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def load_preset(path):
+    if not path:
+        return dict(DEFAULT_PARAMS)
+    with open(path) as f:
+        preset = json.load(f)
+    unknown = set(preset) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown preset options: {', '.join(sorted(unknown))}")
+    if preset.get("filter", "None") not in FILTERS:
+        raise ValueError(f"Unknown filter {preset['filter']!r}; choose from {', '.join(FILTERS)}")
+    if preset.get("blur_mode", "Exact") not in BLUR_MODES:
+        raise ValueError(f"Unknown blur mode {preset['blur_mode']!r}; choose from {', '.join(BLUR_MODES)}")
+    return {**DEFAULT_PARAMS, **preset}
+
+
+def find_inputs(source, recursive=False):
+    """Return (root, paths) for a directory or a glob pattern"""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*") if recursive else os.path.join(source, "*")
+        root = source
+    else:
+        pattern = source
+        root = None
+    paths = sorted(p for p in glob.iglob(pattern, recursive=True)
+                   if os.path.isfile(p) and p.lower().endswith(IMAGE_EXTENSIONS))
+    if root is None:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths]) if paths else "."
+    return root, paths
+
+
+def output_path(path, root, output_dir, extension):
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+    directory, name = os.path.split(relative)
+    # Keep the source extension so a.jpg and a.png don't both become sketch_a.png
+    return os.path.join(output_dir, directory, f"sketch_{name}.{extension}")
+
+
+def sketch_file(path, out_path, params, export_format, quality):
+    """Sketch one file and write it atomically. Runs in a worker process."""
+    with Image.open(path) as image:
+        image.load()
+        megapixels = image.width * image.height / 1e6
+        _, final = process_image(transform_image(image, params), params)
+    data = encode_image(final, export_format, quality)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    # Write under a temporary name so a killed run never leaves a half file
+    # that the next run would mistake for a finished one
+    tmp_path = f"{out_path}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+    return megapixels
+
+
+def run(paths, root, output_dir, params, export_format="PNG", quality=90, workers=None, force=False, log=print):
+    """Sketch ``paths`` into ``output_dir``; returns a summary dict"""
+    extension = EXPORT_FORMATS[export_format][1]
+    todo = []
+    skipped = 0
+    for path in paths:
+        out_path = output_path(path, root, output_dir, extension)
+        if not force and os.path.exists(out_path):
+            skipped += 1
+        else:
+            todo.append((path, out_path))
+
+    pool = get_pool(workers)
+    max_in_flight = 2 * (workers or os.cpu_count())
+    pending = {}
+    done = failed = 0
+    megapixels = 0.0
+    start = time.perf_counter()
+    queue = iter(todo)
+
+    # Keep only a bounded number of files in flight so huge runs stay flat in memory
+    while True:
+        for path, out_path in queue:
+            future = pool.submit(sketch_file, path, out_path, params, export_format, quality)
+            pending[future] = path
+            if len(pending) >= max_in_flight:
+                break
+        if not pending:
+            break
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            path = pending.pop(future)
+            try:
+                megapixels += future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                log(f"FAILED {path}: {e}")
+            if (done + failed) % 50 == 0:
+                elapsed = time.perf_counter() - start
+                log(f"{done + failed}/{len(todo)} images, {done / elapsed:.1f} images/sec, "
+                    f"{megapixels / elapsed:.1f} MP/sec")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": done,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": elapsed,
+        "images_per_sec": done / elapsed if elapsed else 0.0,
+        "mp_per_sec": megapixels / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="input directory or glob pattern")
+    parser.add_argument("output_dir")
+    parser.add_argument("--preset", help="JSON file with the sketch options")
+    parser.add_argument("--format", default="PNG", choices=list(EXPORT_FORMATS))
+    parser.add_argument("--quality", type=int, default=90, help="JPEG quality")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--recursive", action="store_true", help="also sketch images in subdirectories")
+    parser.add_argument("--force", action="store_true", help="redo files that already have an output")
+    args = parser.parse_args(argv)
+
+    try:
+        params = load_preset(args.preset)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    root, paths = find_inputs(args.source, args.recursive)
+    if not paths:
+        parser.error(f"No images found in {args.source}")
+
+    summary = run(paths, root, args.output_dir, params, args.format, args.quality, args.workers, args.force)
+    print(f"Processed {summary['processed']} images ({summary['skipped']} skipped, {summary['failed']} failed) "
+          f"in {summary['seconds']:.1f} s: {summary['images_per_sec']:.2f} images/sec, "
+          f"{summary['mp_per_sec']:.2f} MP/sec")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
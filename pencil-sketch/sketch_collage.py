@@ -0,0 +1,121 @@
+import math
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from sketch_engine import draw_text
+
+LAYOUTS = ["Grid", "Vertical", "Horizontal", "Masonry"]
+
+
+def _fit(width, height, box_width, box_height):
+    """Largest size with the image's aspect ratio that fits in the box"""
+    scale = min(box_width / width, box_height / height)
+    return width * scale, height * scale
+
+
+def plan_layout(sizes, layout="Grid", cols=2, cell_size=400, max_size=4096):
+    """Compute the canvas size and the box of every tile before touching any pixels.
+
+    ``sizes`` are the ``(width, height)`` of the sketches. Grid centres each tile
+    in a ``cell_size`` square, Vertical/Horizontal scale tiles to a common width/
+    height, and Masonry drops each tile into the currently shortest column. If the
+    result is larger than ``max_size`` on either side, everything is scaled down.
+    Returns ``(width, height, [(x, y, w, h), ...])`` in integer pixels.
+    """
+    boxes = []
+    if layout == "Grid":
+        rows = math.ceil(len(sizes) / cols)
+        for i, (w, h) in enumerate(sizes):
+            tw, th = _fit(w, h, cell_size, cell_size)
+            x = (i % cols) * cell_size + (cell_size - tw) / 2
+            y = (i // cols) * cell_size + (cell_size - th) / 2
+            boxes.append((x, y, tw, th))
+        total_width, total_height = cols * cell_size, rows * cell_size
+
+    elif layout == "Vertical":
+        y = 0
+        for w, h in sizes:
+            th = h * cell_size / w
+            boxes.append((0, y, cell_size, th))
+            y += th
+        total_width, total_height = cell_size, y
+
+    elif layout == "Horizontal":
+        x = 0
+        for w, h in sizes:
+            tw = w * cell_size / h
+            boxes.append((x, 0, tw, cell_size))
+            x += tw
+        total_width, total_height = x, cell_size
+
+    elif layout == "Masonry":
+        column_heights = [0] * cols
+        for w, h in sizes:
+            col = column_heights.index(min(column_heights))
+            th = h * cell_size / w
+            boxes.append((col * cell_size, column_heights[col], cell_size, th))
+            column_heights[col] += th
+        total_width, total_height = cols * cell_size, max(column_heights)
+
+    else:
+        raise ValueError(f"Unknown collage layout: {layout}")
+
+    scale = min(1.0, max_size / max(total_width, total_height))
+    placements = []
+    for x, y, w, h in boxes:
+        # Round the edges rather than the sizes so neighbouring tiles never overlap or gap
+        x0, y0 = round(x * scale), round(y * scale)
+        x1, y1 = round((x + w) * scale), round((y + h) * scale)
+        placements.append((x0, y0, max(x1 - x0, 1), max(y1 - y0, 1)))
+    return max(round(total_width * scale), 1), max(round(total_height * scale), 1), placements
+
+
+def _resize(tile, width, height):
+    # INTER_AREA is the fast, alias-free choice for the usual case of shrinking
+    shrinking = width < tile.shape[1] or height < tile.shape[0]
+    return cv2.resize(tile, (width, height), interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+
+
+def _paste_rgba(canvas, overlay, x, y):
+    """Alpha-composite an RGBA array onto the canvas at (x, y), clipped to the canvas"""
+    height, width = canvas.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + overlay.shape[1], width), min(y + overlay.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = overlay[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.uint16)
+    dst = canvas[y0:y1, x0:x1]
+    alpha = src[..., 3:4]
+    dst[...] = ((src[..., :3] * alpha + dst.astype(np.uint16) * (255 - alpha) + 127) // 255).astype(np.uint8)
+
+
+def compose_collage(sketches, layout="Grid", cols=2, cell_size=400, max_size=4096,
+                    text="", sticker=None, background=255):
+    """Build the collage into a single preallocated RGB canvas.
+
+    ``sketches`` are uint8 arrays (gray or RGB) or PIL images. Each one is resized
+    straight into its box; the caption text and an optional RGBA ``sticker`` are
+    drawn onto the same canvas afterwards.
+    """
+    tiles = [np.asarray(sketch) for sketch in sketches]
+    width, height, placements = plan_layout([(t.shape[1], t.shape[0]) for t in tiles],
+                                            layout, cols, cell_size, max_size)
+    canvas = np.full((height, width, 3), background, dtype=np.uint8)
+    for tile, (x, y, w, h) in zip(tiles, placements):
+        w, h = min(w, width - x), min(h, height - y)
+        if w <= 0 or h <= 0:
+            continue
+        resized = _resize(tile, w, h)
+        canvas[y:y + h, x:x + w] = resized[..., None] if resized.ndim == 2 else resized[..., :3]
+
+    # Custom Text
+    if text:
+        draw_text(canvas, (10, 10), text, "black")
+
+    # Sticker in the bottom-right corner
+    if sticker is not None:
+        overlay = np.asarray(sticker.convert("RGBA") if isinstance(sticker, Image.Image) else sticker)
+        _paste_rgba(canvas, overlay, width - 100, height - 100)
+    return canvas
@@ -0,0 +1,331 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+
+FILTERS = ["None", "Sepia", "Black & White", "Blur", "Sharpen", "Emboss", "Edge Enhance", "Colorize"]
+
+# Blur back ends of the sketch core, from exact to fastest. Only "Exact" gives
+# the original output; the others approximate the same 21x21 Gaussian.
+BLUR_MODES = ["Exact", "Box cascade", "Integral image", "Half resolution"]
+
+# Default parameters for one image; the UI fills these in from the sidebar widgets
+DEFAULT_PARAMS = {
+    "crop": None,
+    "rotate": 0,
+    "resize": None,
+    "brightness": 1.0,
+    "contrast": 1.0,
+    "filter": "None",
+    "color": "#FF5733",
+    "watermark": "",
+    "tile_budget": None,
+    "proxy_scale": 1.0,
+    "blur_mode": "Exact",
+}
+
+# Half the 21x21 blur kernel: how far a sketch pixel can see into its neighbours
+BLUR_HALO = 21 // 2
+# Rough working memory of the sketch core per pixel: RGB crop and array, gray,
+# inverted, blurred, inverted blurred and the divided result
+SKETCH_BYTES_PER_PIXEL = 14
+# Pixels converted to gray per band, so the RGB copy stays a few MB
+GRAY_BAND_PIXELS = 1 << 20
+
+_pool = None
+
+
+def get_pool(max_workers=None):
+    """Return the shared worker pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+    return _pool
+
+
+# Crop, rotate and resize, in the same order as the sidebar options
+def transform_image(image, params):
+    if params.get("crop"):
+        image = image.crop(tuple(params["crop"]))
+    if params.get("rotate"):
+        image = image.rotate(params["rotate"], expand=True)
+    if params.get("resize"):
+        image = image.resize(tuple(params["resize"]))
+    return image
+
+
+# Pencil Sketch Conversion: grayscale -> invert -> blur -> divide
+def to_gray(image, out=None):
+    # Same values as converting to RGB first, but only a band of rows is ever
+    # copied out of PIL at a time instead of the whole colour image
+    if image.mode == "L":
+        return np.asarray(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    code = cv2.COLOR_RGBA2GRAY if image.mode == "RGBA" else cv2.COLOR_RGB2GRAY
+    width, height = image.size
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+    rows = max(GRAY_BAND_PIXELS // max(width, 1), 1)
+    for y in range(0, height, rows):
+        band = np.asarray(image.crop((0, y, width, min(y + rows, height))))
+        cv2.cvtColor(band, code, dst=out[y:y + rows])
+    return out
+
+
+def invert(gray_image):
+    return 255 - gray_image
+
+
+# The 21x21 kernel with sigmaX=0 makes OpenCV use sigma = 0.3 * (10 - 1) + 0.8 = 3.5.
+# Every approximation below aims for that same variance (12.25).
+def _gaussian_blur(src, dst):
+    return cv2.GaussianBlur(src, (21, 21), sigmaX=0, sigmaY=0, dst=dst)
+
+
+def _box_cascade_blur(src, dst):
+    # Three 7x7 box passes: variance 3 * (7**2 - 1) / 12 = 12
+    dst = cv2.blur(src, (7, 7), dst=dst)
+    cv2.blur(dst, (7, 7), dst=dst)
+    return cv2.blur(dst, (7, 7), dst=dst)
+
+
+# Radius of the single box used by the integral-image blur: a 13x13 box has
+# variance (13**2 - 1) / 12 = 14
+_INTEGRAL_RADIUS = 6
+
+
+def _integral_blur(src, dst):
+    # Each output pixel is four lookups into the summed-area table
+    r = _INTEGRAL_RADIUS
+    k = 2 * r + 1
+    sums = cv2.integral(cv2.copyMakeBorder(src, r, r, r, r, cv2.BORDER_REFLECT_101))
+    total = sums[k:, k:] - sums[:-k, k:]
+    total -= sums[k:, :-k]
+    total += sums[:-k, :-k]
+    return cv2.convertScaleAbs(total, dst=dst, alpha=1 / (k * k))
+
+
+def _half_resolution_blur(src, dst):
+    # pyrDown and pyrUp each add a variance of about 1 at full resolution, so the
+    # blur in between only needs the remaining 10.25, i.e. sigma 1.6 at half size
+    height, width = src.shape
+    small = cv2.pyrDown(src)
+    cv2.GaussianBlur(small, (0, 0), sigmaX=1.6, dst=small)
+    return cv2.pyrUp(small, dst=dst, dstsize=(width, height))
+
+
+# mode -> (blur function, how far a sketch pixel can see into its neighbours)
+_BLURS = {
+    "Exact": (_gaussian_blur, BLUR_HALO),
+    "Box cascade": (_box_cascade_blur, 9),
+    "Integral image": (_integral_blur, _INTEGRAL_RADIUS),
+    # pyrDown (2) + Gaussian at half size (2 * 5) + pyrUp (2), rounded up
+    "Half resolution": (_half_resolution_blur, 16),
+}
+
+
+def blur(inverted_image, mode="Exact", out=None):
+    if mode not in _BLURS:
+        raise ValueError(f"Unknown blur mode {mode!r}; choose from {', '.join(BLUR_MODES)}")
+    return _BLURS[mode][0](inverted_image, out)
+
+
+def blur_halo(mode="Exact"):
+    return _BLURS[mode][1]
+
+
+def divide(gray_image, blurred, out=None):
+    inverted_blurred = 255 - blurred
+    return cv2.divide(gray_image, inverted_blurred, dst=out, scale=256.0)
+
+
+def pencil_sketch(image, out=None, mode="Exact"):
+    return sketch_gray(to_gray(image), out, mode)
+
+
+def sketch_gray(gray_image, out=None, mode="Exact"):
+    # One scratch buffer is inverted, blurred and inverted back in place
+    work = np.subtract(255, gray_image, dtype=np.uint8)
+    blur(work, mode, out=work)
+    np.subtract(255, work, out=work)
+    return cv2.divide(gray_image, work, dst=out, scale=256.0)
+
+
+def sketch_tiles(width, height, max_bytes, halo=BLUR_HALO):
+    """Split the image into tiles whose working set (with halo) fits in ``max_bytes``"""
+    halo = 2 * halo
+    max_pixels = max_bytes // SKETCH_BYTES_PER_PIXEL
+    # Prefer full-width strips; fall back to square tiles for very wide images
+    tile_w = width
+    tile_h = max_pixels // (tile_w + halo) - halo
+    if tile_h < 64:
+        tile_w = tile_h = max(int(max_pixels ** 0.5) - halo, 64)
+    for y in range(0, height, tile_h):
+        for x in range(0, width, tile_w):
+            yield x, y, min(x + tile_w, width), min(y + tile_h, height)
+
+
+def pencil_sketch_tiled(image, max_bytes=64 * 1024 * 1024, out=None, mode="Exact"):
+    """Same result as pencil_sketch, computed tile by tile into one output buffer.
+
+    Each tile is read with a halo (BLUR_HALO pixels for the exact blur) so the blur
+    sees exactly the same neighbourhood as it would on the full image; only the
+    tile interior is written out. Peak memory is the output buffer plus roughly
+    ``max_bytes``.
+    """
+    width, height = image.size
+    halo = blur_halo(mode)
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+    for x0, y0, x1, y1 in sketch_tiles(width, height, max_bytes, halo):
+        # Tiles start on even pixels so the half-resolution blur samples the
+        # same grid as it does on the whole image
+        hx0, hy0 = max(x0 - halo, 0) & ~1, max(y0 - halo, 0) & ~1
+        hx1, hy1 = min(x1 + halo, width), min(y1 + halo, height)
+        tile = pencil_sketch(image.crop((hx0, hy0, hx1, hy1)), mode=mode)
+        out[y0:y1, x0:x1] = tile[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+    return out
+
+
+def needs_tiling(image, max_bytes):
+    """Whether sketching the whole image at once would go over the memory budget"""
+    return bool(max_bytes) and image.width * image.height * SKETCH_BYTES_PER_PIXEL > max_bytes
+
+
+# Every filter below works on the single-channel sketch and only expands it to
+# three channels when the filter actually produces colour (Sepia, Colorize).
+# The lookup tables are built by running the original PIL/OpenCV operation on a
+# 0..255 gradient, so the results match it exactly.
+_GRADIENT = np.arange(256, dtype=np.uint8).reshape(1, 256)
+_GRADIENT_PIL = Image.fromarray(_GRADIENT)
+
+SEPIA_MATRIX = np.array([[0.393, 0.769, 0.189],
+                         [0.349, 0.686, 0.168],
+                         [0.272, 0.534, 0.131]])
+# 256x1x3 table: gray value -> sepia RGB
+SEPIA_LUT = cv2.transform(cv2.cvtColor(_GRADIENT, cv2.COLOR_GRAY2RGB), SEPIA_MATRIX).reshape(256, 1, 3)
+
+# Filters that PIL applies channel by channel, so they can run on the gray sketch
+_PIL_FILTERS = {
+    "Blur": ImageFilter.GaussianBlur(radius=3),
+    "Sharpen": ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3),
+    "Emboss": ImageFilter.EMBOSS,
+    "Edge Enhance": ImageFilter.EDGE_ENHANCE,
+}
+
+
+def _blend_lut(base, factor):
+    """Table for ImageEnhance: Image.blend(constant ``base`` image, pixel, factor)"""
+    degenerate = Image.new("L", _GRADIENT_PIL.size, base)
+    return np.asarray(Image.blend(degenerate, _GRADIENT_PIL, factor))[0]
+
+
+def tone_lut(sketch, brightness, contrast):
+    """One table doing ImageEnhance.Brightness followed by ImageEnhance.Contrast"""
+    lut = _blend_lut(0, brightness)
+    # Contrast blends towards the mean of the brightened image, which the
+    # histogram gives without materialising that image
+    hist = cv2.calcHist([sketch], [0], None, [256], [0, 256]).ravel()
+    mean = int(float(hist @ lut) / sketch.size + 0.5)
+    return _blend_lut(mean, contrast)[lut]
+
+
+def adjust_tone(sketch, brightness, contrast, out=None):
+    """Brightness and contrast as a single LUT pass; pass ``out=sketch`` to work in place.
+
+    With both factors at 1.0 there is nothing to do and ``sketch`` is returned as is.
+    """
+    if brightness == 1.0 and contrast == 1.0:
+        if out is not None and out is not sketch:
+            out[...] = sketch
+            return out
+        return sketch
+    return cv2.LUT(sketch, tone_lut(sketch, brightness, contrast), dst=out)
+
+
+@lru_cache(maxsize=64)
+def colorize_lut(color):
+    r, g, b = int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+    return np.asarray(ImageOps.colorize(_GRADIENT_PIL, (r, g, b), (255, 255, 255))).reshape(256, 1, 3)
+
+
+def expand_lut(sketch, lut):
+    """Map the gray sketch through a 256x1x3 colour table into one new RGB buffer"""
+    rgb = cv2.cvtColor(sketch, cv2.COLOR_GRAY2RGB)
+    return cv2.LUT(rgb, lut, dst=rgb)
+
+
+# Extra filters from the "Filter" selectbox. Returns ``sketch`` itself when the
+# filter leaves it unchanged ("None", and "Black & White" on an already gray sketch).
+def apply_filter(sketch, filter_type, color="#FF5733"):
+    if filter_type == "Sepia":
+        return expand_lut(sketch, SEPIA_LUT)
+
+    elif filter_type == "Colorize":
+        return expand_lut(sketch, colorize_lut(color))
+
+    elif filter_type in _PIL_FILTERS:
+        return np.array(Image.fromarray(sketch).filter(_PIL_FILTERS[filter_type]))
+
+    return sketch
+
+
+# Brightness, Contrast and then the selected filter
+def apply_filters(sketch, params, inplace=False):
+    sketch = adjust_tone(sketch, params["brightness"], params["contrast"], out=sketch if inplace else None)
+    return apply_filter(sketch, params["filter"], params["color"])
+
+
+def draw_text(image, xy, text, fill, font=None):
+    """Draw text onto a uint8 array in place.
+
+    Only the strip under the text goes through PIL, not the whole image.
+    """
+    font = font or ImageFont.load_default()
+    height, width = image.shape[:2]
+    x, y = xy
+    x0, y0, x1, y1 = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((x, y), text, font=font)
+    x0, y0, x1, y1 = max(x0, 0), max(y0, 0), min(x1, width), min(y1, height)
+    if x0 >= x1 or y0 >= y1:
+        return image
+    region = Image.fromarray(image[y0:y1, x0:x1])
+    ImageDraw.Draw(region).text((x - x0, y - y0), text, fill=fill, font=font)
+    image[y0:y1, x0:x1] = np.asarray(region)
+    return image
+
+
+# Draw the watermark text in the bottom-right corner, in place
+def add_watermark(sketch, watermark_text):
+    font = ImageFont.load_default()
+    height, width = sketch.shape[:2]
+
+    # Use textbbox to get the bounding box of the text
+    text_bbox = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), watermark_text, font=font)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    x = width - text_width - 10
+    y = height - text_height - 10
+    return draw_text(sketch, (x, y), watermark_text, "white", font)
+
+
+def process_image(image, params):
+    """Sketch one (already cropped/rotated/resized) image.
+
+    Returns the plain sketch and the final sketch with filters and watermark
+    applied, as uint8 arrays (HxW, or HxWx3 for colour filters).
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    if needs_tiling(image, params["tile_budget"]):
+        sketch = pencil_sketch_tiled(image, params["tile_budget"], mode=params["blur_mode"])
+    else:
+        sketch = pencil_sketch(image, mode=params["blur_mode"])
+    final = apply_filters(sketch, params)
+    if params["watermark"]:
+        # The watermark is drawn in place, so keep the plain sketch intact
+        final = add_watermark(final.copy() if final is sketch else final, params["watermark"])
+    return sketch, final
@@ -0,0 +1,99 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# name -> (PIL format, file extension, mime type, save options)
+EXPORT_FORMATS = {
+    "PNG": ("PNG", "png", "image/png", {}),
+    # Low effort lossless WebP is still smaller than PNG for sketches, and faster
+    "WebP (lossless)": ("WEBP", "webp", "image/webp", {"lossless": True, "method": 2, "quality": 0}),
+    "JPEG": ("JPEG", "jpg", "image/jpeg", {"optimize": True}),
+}
+
+# Bytes handed out per chunk when an entry is streamed
+CHUNK_SIZE = 1 << 20
+
+
+def encode_image(image, export_format="PNG", quality=90):
+    """Encode one sketch (PIL image or uint8 array) to bytes"""
+    pil_format, _, _, options = EXPORT_FORMATS[export_format]
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    if pil_format == "JPEG":
+        options = {**options, "quality": quality}
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, **options)
+    return buffer.getvalue()
+
+
+def encode_images(images, export_format="PNG", quality=90, max_workers=None):
+    """Encode images in parallel, yielding the encoded bytes in input order.
+
+    PIL releases the GIL while compressing, so threads are enough and the images
+    don't need to be copied into other processes. At most ``max_workers`` extra
+    images are encoded ahead of the consumer, so memory stays flat.
+    """
+    max_workers = max_workers or os.cpu_count()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = []
+        for image in images:
+            pending.append(pool.submit(encode_image, image, export_format, quality))
+            if len(pending) > max_workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects what ZipFile writes"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def stream_zip(named_images, export_format="PNG", quality=90, max_workers=None):
+    """Yield a ZIP archive of ``(name, image)`` pairs chunk by chunk.
+
+    Entries are encoded in parallel and written as they finish. PNG, WebP and
+    JPEG are already compressed, so entries are stored rather than deflated
+    again. Only the entries currently being encoded are ever held in memory.
+    """
+    _, extension, _, _ = EXPORT_FORMATS[export_format]
+    named_images = list(named_images)
+    names = [f"{os.path.splitext(name)[0]}.{extension}" for name, _ in named_images]
+    encoded = encode_images((image for _, image in named_images), export_format, quality, max_workers)
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zip_file:
+        for name, data in zip(names, encoded):
+            with zip_file.open(name, "w") as entry:
+                for start in range(0, len(data), CHUNK_SIZE):
+                    entry.write(data[start:start + CHUNK_SIZE])
+                    yield from sink.drain()
+            yield from sink.drain()
+    # Central directory
+    yield from sink.drain()
+
+
+def write_zip(file, named_images, export_format="PNG", quality=90, max_workers=None):
+    """Stream the archive into an open binary file; returns the number of bytes written"""
+    size = 0
+    for chunk in stream_zip(named_images, export_format, quality, max_workers):
+        file.write(chunk)
+        size += len(chunk)
+    return size
@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import as_completed
+
+from PIL import Image
+
+from sketch_engine import (
+    DEFAULT_PARAMS, add_watermark, adjust_tone, apply_filter,
+    blur, divide, get_pool, invert, needs_tiling, pencil_sketch, pencil_sketch_tiled, to_gray,
+)
+
+
+class Stage:
+    """One step of the sketch pipeline.
+
+    ``func(params, *input_values)`` computes the stage from the outputs of the
+    ``inputs`` stages. Only the keys listed in ``params`` affect the result, so a
+    stage is reused as long as those and every upstream stage are unchanged.
+
+    ``fused`` is an optional ``(param, func, inputs)`` shortcut used instead when
+    ``params[param]`` is set. It must give the same output, so it shares the key.
+    """
+
+    def __init__(self, name, func, inputs=(), params=(), fused=None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.params = params
+        self.fused = fused
+
+    def resolve(self, params):
+        """The function and inputs to use for these parameters"""
+        if self.fused and params.get(self.fused[0]):
+            return self.fused[1], self.fused[2]
+        return self.func, self.inputs
+
+
+def _proxy(params, image):
+    scale = params["proxy_scale"]
+    if scale >= 1.0:
+        return image
+    size = (max(round(image.width * scale), 1), max(round(image.height * scale), 1))
+    return image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+def proxy_params(params, size, max_side=1024):
+    """Parameters that run the same chain on a copy of the source downscaled to ``max_side``.
+
+    Crop boxes and resize targets are given in full-resolution pixels, so they are
+    scaled down along with the source.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    scale = min(1.0, max_side / max(size))
+    if scale >= 1.0:
+        return params
+    params["proxy_scale"] = scale
+    if params["crop"]:
+        params["crop"] = tuple(round(v * scale) for v in params["crop"])
+    if params["resize"]:
+        params["resize"] = tuple(max(round(v * scale), 1) for v in params["resize"])
+    return params
+
+
+def _crop(params, image):
+    return image.crop(tuple(params["crop"])) if params["crop"] else image
+
+
+def _rotate(params, image):
+    return image.rotate(params["rotate"], expand=True) if params["rotate"] else image
+
+
+def _resize(params, image):
+    return image.resize(tuple(params["resize"])) if params["resize"] else image
+
+
+def _divide_tiled(params, image):
+    # Large images skip the full-size grayscale/invert/blur intermediates
+    if needs_tiling(image, params["tile_budget"]):
+        return pencil_sketch_tiled(image, params["tile_budget"], mode=params["blur_mode"])
+    return pencil_sketch(image, mode=params["blur_mode"])
+
+
+def _watermark(params, sketch):
+    if not params["watermark"]:
+        return sketch
+    # Drawing is in place, so never touch the cached filter output
+    return add_watermark(sketch.copy(), params["watermark"])
+
+
+# The stage graph, in topological order. "source" is the decoded upload and
+# is supplied by the caller rather than computed; "proxy" is the source itself
+# unless a preview scale is set.
+STAGES = [
+    Stage("proxy", _proxy, ("source",), ("proxy_scale",)),
+    Stage("crop", _crop, ("proxy",), ("crop",)),
+    Stage("rotate", _rotate, ("crop",), ("rotate",)),
+    Stage("resize", _resize, ("rotate",), ("resize",)),
+    Stage("grayscale", lambda params, image: to_gray(image), ("resize",)),
+    Stage("invert", lambda params, gray: invert(gray), ("grayscale",)),
+    Stage("blur", lambda params, inverted: blur(inverted, params["blur_mode"]), ("invert",), ("blur_mode",)),
+    Stage("divide", lambda params, gray, blurred: divide(gray, blurred), ("grayscale", "blur"),
+          fused=("tile_budget", _divide_tiled, ("resize",))),
+    # Brightness and contrast share one lookup table, so they are one stage
+    Stage("tone", lambda params, sketch: adjust_tone(sketch, params["brightness"], params["contrast"]),
+          ("divide",), ("brightness", "contrast")),
+    Stage("filter", lambda params, sketch: apply_filter(sketch, params["filter"], params["color"]),
+          ("tone",), ("filter", "color")),
+    Stage("watermark", _watermark, ("filter",), ("watermark",)),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def run_stages(names, values, params):
+    """Compute ``names`` (in order) given the already known stage ``values``.
+
+    Runs in a worker process. Returns ``{name: (output, seconds, alias)}`` for
+    every computed stage so the caller can cache the intermediate results. When a
+    stage passes one of its inputs straight through (e.g. no crop), ``alias`` names
+    that input and the output is not sent back a second time.
+    """
+    values = dict(values)
+    computed = {}
+    for name in names:
+        func, inputs = STAGES_BY_NAME[name].resolve(params)
+        start = time.perf_counter()
+        output = func(params, *(values[i] for i in inputs))
+        seconds = time.perf_counter() - start
+        alias = next((i for i in inputs if values[i] is output), None)
+        computed[name] = (None if alias else output, seconds, alias)
+        values[name] = output
+    return computed
+
+
+class SketchPipeline:
+    """Runs the stage graph, caching every stage output against its inputs"""
+
+    # Pass-through stages remembered by key; only the key is kept, not the image
+    MAX_ALIASES = 4096
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.timings = {stage.name: {"runs": 0, "seconds": 0.0, "last": 0.0} for stage in STAGES}
+        self._aliases = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, name, digest, params):
+        """Cache key of a stage: its own parameters plus the keys of its inputs"""
+        if name == "source":
+            return ("source", digest)
+        stage = STAGES_BY_NAME[name]
+        return (name, tuple(_freeze(params[p]) for p in stage.params),
+                *(self.key(i, digest, params) for i in stage.inputs))
+
+    def load_source(self, digest, decode):
+        """The decoded source; callers keep it and pass it to ``run`` / ``run_batch``,
+        since the cache may evict it (or never hold it, if it is over budget)"""
+        return self.cache.get_or_compute(self.key("source", digest, None), decode)
+
+    def plan(self, digest, params, targets, source=None):
+        """Find which stages must be computed and which cached values they need"""
+        values = {} if source is None else {"source": source}
+        to_compute = set()
+
+        def resolve(name):
+            if name in values or name in to_compute:
+                return
+            key = self.key(name, digest, params)
+            with self._lock:
+                alias = self._aliases.get(key)
+            if alias is not None:
+                # A pass-through stage is not cached (it would count the image twice);
+                # it is whatever its input is
+                resolve(alias)
+                if alias in values:
+                    values[name] = values[alias]
+                else:
+                    to_compute.add(name)
+                return
+            value = self.cache.get(key)
+            if value is not None:
+                values[name] = value
+                return
+            if name == "source":
+                raise KeyError(f"source image {digest} is not loaded")
+            to_compute.add(name)
+            for i in STAGES_BY_NAME[name].resolve(params)[1]:
+                resolve(i)
+
+        for target in targets:
+            resolve(target)
+        names = [stage.name for stage in STAGES if stage.name in to_compute]
+        return names, values
+
+    def _store(self, digest, params, values, computed):
+        with self._lock:
+            for name, (_, seconds, _) in computed.items():
+                timing = self.timings[name]
+                timing["runs"] += 1
+                timing["seconds"] += seconds
+                timing["last"] = seconds
+        for name, (output, _, alias) in computed.items():
+            if alias:
+                self._remember_alias(self.key(name, digest, params), alias)
+                values[name] = values[alias]
+            else:
+                values[name] = self.cache.put(self.key(name, digest, params), output)
+        return values
+
+    def _remember_alias(self, key, alias):
+        with self._lock:
+            self._aliases[key] = alias
+            self._aliases.move_to_end(key)
+            while len(self._aliases) > self.MAX_ALIASES:
+                self._aliases.popitem(last=False)
+
+    def run(self, digest, params, targets=("watermark",), source=None):
+        """Compute ``targets`` for one image in this process"""
+        params = {**DEFAULT_PARAMS, **params}
+        names, values = self.plan(digest, params, targets, source)
+        values = self._store(digest, params, values, run_stages(names, values, params))
+        return {target: values[target] for target in targets}
+
+    def run_batch(self, jobs, targets=("divide", "watermark"), max_workers=None, on_progress=None, sources=None):
+        """Compute ``targets`` for many ``(digest, params)`` jobs across the worker pool.
+
+        ``sources`` maps digests to their decoded images. Only the stages that
+        are not cached yet are sent to the workers. Results come back in job
+        order; ``on_progress(done, total)`` fires as jobs finish.
+        """
+        sources = sources or {}
+        jobs = [(digest, {**DEFAULT_PARAMS, **params}) for digest, params in jobs]
+        plans = [self.plan(digest, params, targets, sources.get(digest)) for digest, params in jobs]
+        results = [None] * len(jobs)
+        pending = [i for i, (names, _) in enumerate(plans) if names]
+
+        def finish(i, computed):
+            digest, params = jobs[i]
+            values = self._store(digest, params, plans[i][1], computed)
+            results[i] = {target: values[target] for target in targets}
+
+        for i, (names, _) in enumerate(plans):
+            if not names:
+                finish(i, {})
+
+        if len(pending) <= 1 or max_workers == 1:
+            for done, i in enumerate(pending, start=1):
+                names, values = plans[i]
+                finish(i, run_stages(names, values, jobs[i][1]))
+                if on_progress:
+                    on_progress(done, len(pending))
+            return results
+
+        pool = get_pool(max_workers)
+        futures = {}
+        for i in pending:
+            names, values = plans[i]
+            # Ship only the cached values the worker actually reads
+            inputs = {n: values[n] for name in names for n in STAGES_BY_NAME[name].resolve(jobs[i][1])[1]
+                      if n in values}
+            futures[pool.submit(run_stages, names, inputs, jobs[i][1])] = i
+        for done, future in enumerate(as_completed(futures), start=1):
+            finish(futures[future], future.result())
+            if on_progress:
+                on_progress(done, len(pending))
+        return results
+
+    def timing_report(self):
+        """Per-stage timings, slowest stage first"""
+        with self._lock:
+            rows = [{"stage": name, **timing} for name, timing in self.timings.items()]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SessionImageStore:
+    """Per-session store of image arrays with a memory budget.
+
+    Arrays are kept in memory until the resident total goes over ``max_bytes``;
+    then the least recently used ones are written to ``.npy`` files in a private
+    temp directory and dropped from memory. A spilled array comes back from
+    ``get`` as a read-only memory map, so its pages are only read from disk when
+    the collage or ZIP export actually touches them, and the OS can drop them
+    again under pressure. The temp directory is removed when the store is closed
+    or garbage collected (i.e. when the session ends).
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        self.spilled_bytes = 0
+        # key -> array (resident) or path of the spilled .npy file
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self.spill_dir = tempfile.mkdtemp(prefix="sketch_session_", dir=spill_dir)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.spill_dir, ignore_errors=True)
+
+    def put(self, key, array):
+        """Store a private copy of ``array``; arrays shared with a cache would stay
+        in memory after spilling, so nothing would actually be freed"""
+        array = np.array(array, copy=True)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = array
+            self._sizes[key] = array.nbytes
+            self.resident_bytes += array.nbytes
+            self._spill_to_budget()
+        return array
+
+    def get(self, key):
+        """The array for ``key`` (a read-only memory map if it was spilled), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                return None
+            self._entries.move_to_end(key)
+        if isinstance(value, str):
+            return np.load(value, mmap_mode="r")
+        return value
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def retain(self, keys):
+        """Drop every entry whose key is not in ``keys`` (e.g. removed uploads)"""
+        keys = set(keys)
+        with self._lock:
+            for key in [k for k in self._entries if k not in keys]:
+                self._discard(key)
+
+    def set_budget(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._spill_to_budget()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+
+    def close(self):
+        self.clear()
+        self._finalizer()
+
+    def stats(self):
+        with self._lock:
+            spilled = sum(isinstance(v, str) for v in self._entries.values())
+            return {
+                "entries": len(self._entries),
+                "resident_entries": len(self._entries) - spilled,
+                "spilled_entries": spilled,
+                "resident_bytes": self.resident_bytes,
+                "spilled_bytes": self.spilled_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    # The helpers below expect the lock to be held
+    def _discard(self, key):
+        value = self._entries.pop(key, None)
+        if value is None:
+            return
+        size = self._sizes.pop(key)
+        if isinstance(value, str):
+            self.spilled_bytes -= size
+            try:
+                os.remove(value)
+            except OSError:
+                # Still mapped somewhere on platforms that lock open files
+                pass
+        else:
+            self.resident_bytes -= size
+
+    def _spill_to_budget(self):
+        for key in list(self._entries):
+            if self.resident_bytes <= self.max_bytes:
+                return
+            value = self._entries[key]
+            if isinstance(value, str):
+                continue
+            self._counter += 1
+            path = os.path.join(self.spill_dir, f"{self._counter}.npy")
+            np.save(path, value)
+            self._entries[key] = path
+            self.resident_bytes -= self._sizes[key]
+            self.spilled_bytes += self._sizes[key]
+
+
+class SessionVideoFile:
+    """The video a session has uploaded, written to a file OpenCV can open.
+
+    Only the current upload is kept: writing a different one removes the file
+    of the previous one. Files live in a private temp directory that is removed
+    when the object is closed or garbage collected (i.e. when the session ends).
+    """
+
+    def __init__(self, temp_dir=None):
+        self.path = None
+        self.temp_dir = tempfile.mkdtemp(prefix="sketch_video_", dir=temp_dir)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+    def write(self, key, data, extension=""):
+        """Path of the file holding ``data``; only written when ``key`` changes"""
+        path = os.path.join(self.temp_dir, f"{key}{extension}")
+        if path != self.path:
+            self.discard()
+            with open(path, "wb") as f:
+                f.write(data)
+            self.path = path
+        return path
+
+    def discard(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            # Still open somewhere on platforms that lock open files
+            pass
+        self.path = None
+
+    def close(self):
+        self.discard()
+        self._finalizer()
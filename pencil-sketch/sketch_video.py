@@ -0,0 +1,185 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from sketch_engine import DEFAULT_PARAMS, add_watermark, apply_filters, sketch_gray
+
+# Frames decoded ahead of the sketcher; together with the in-flight sketches
+# this is all the video that is ever held in memory
+RING_SIZE = 8
+
+_END = object()
+
+
+def video_info(path):
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+        return {
+            "fps": capture.get(cv2.CAP_PROP_FPS) or 25.0,
+            "frames": int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "width": int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        capture.release()
+
+
+def read_frames(path):
+    """Yield ``(index, BGR frame)`` one frame at a time"""
+    capture = cv2.VideoCapture(path)
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield index, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def sketch_frame(frame, params):
+    """Sketch one BGR frame with the still-image filters; returns a BGR frame"""
+    params = {**DEFAULT_PARAMS, **params}
+    sketch = sketch_gray(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), mode=params["blur_mode"])
+    final = apply_filters(sketch, params, inplace=True)
+    if params["watermark"]:
+        final = add_watermark(final, params["watermark"])
+    code = cv2.COLOR_GRAY2BGR if final.ndim == 2 else cv2.COLOR_RGB2BGR
+    return cv2.cvtColor(final, code)
+
+
+def _decode_into(path, frames, stop):
+    """Decoder thread: fill the ring buffer until the video ends or we are stopped"""
+    try:
+        for item in read_frames(path):
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if stop.is_set():
+                return
+    finally:
+        frames.put(_END)
+
+
+def _stop_decoder(decoder, frames, stop):
+    stop.set()
+    # Unblock the decoder if it is waiting on a full ring
+    while decoder.is_alive():
+        try:
+            frames.get_nowait()
+        except queue.Empty:
+            decoder.join(timeout=0.1)
+
+
+def sketch_video(in_path, out_path, params, workers=None, on_progress=None, fourcc="mp4v"):
+    """Convert a whole video to a pencil-sketch video.
+
+    Decoding, sketching and encoding run on separate threads and overlap; OpenCV
+    releases the GIL, so the sketch threads run in parallel. Memory is bounded by
+    the ring of decoded frames plus the frames being sketched, not by the clip
+    length. ``on_progress(done, total)`` is called from this thread.
+    """
+    info = video_info(in_path)
+    workers = workers or min(os.cpu_count() or 1, 4)
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*fourcc), info["fps"],
+                             (info["width"], info["height"]))
+    if not writer.isOpened():
+        raise ValueError(f"Cannot write video {out_path}")
+
+    frames = queue.Queue(maxsize=RING_SIZE)
+    encoded = queue.Queue(maxsize=RING_SIZE)
+    stop = threading.Event()
+
+    errors = []
+
+    def encode():
+        while True:
+            future = encoded.get()
+            if future is _END:
+                return
+            # Keep draining after a failure so the producer never blocks
+            if not errors:
+                try:
+                    writer.write(future.result())
+                except Exception as e:
+                    errors.append(e)
+
+    decoder = threading.Thread(target=_decode_into, args=(in_path, frames, stop), daemon=True)
+    encoder = threading.Thread(target=encode, daemon=True)
+    decoder.start()
+    encoder.start()
+
+    done = 0
+    in_flight = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                item = frames.get()
+                if item is _END or errors:
+                    break
+                in_flight.append(pool.submit(sketch_frame, item[1], params))
+                # Hand futures to the encoder in order; it waits on each one
+                while len(in_flight) > workers:
+                    encoded.put(in_flight.popleft())
+                    done += 1
+                    if on_progress:
+                        on_progress(done, info["frames"])
+            while in_flight:
+                encoded.put(in_flight.popleft())
+                done += 1
+                if on_progress:
+                    on_progress(done, info["frames"])
+    finally:
+        encoded.put(_END)
+        encoder.join()
+        _stop_decoder(decoder, frames, stop)
+        writer.release()
+    if errors:
+        raise errors[0]
+    return done
+
+
+def preview_frames(path, params, max_lag=0.1):
+    """Yield sketched RGB frames in real time for a live preview.
+
+    Frames are decoded on a background thread. When sketching falls behind the
+    video clock by more than ``max_lag`` seconds, late frames are dropped
+    unsketched so the preview keeps pace instead of drifting.
+    Yields ``(index, rgb_frame, skipped_so_far)``.
+    """
+    fps = video_info(path)["fps"]
+    frames = queue.Queue(maxsize=RING_SIZE)
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode_into, args=(path, frames, stop), daemon=True)
+    decoder.start()
+
+    skipped = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            item = frames.get()
+            if item is _END:
+                return
+            index, frame = item
+            due = index / fps
+            now = time.perf_counter() - start
+            if now > due + max_lag:
+                skipped += 1
+                continue
+            if now < due:
+                time.sleep(due - now)
+            yield index, cv2.cvtColor(sketch_frame(frame, params), cv2.COLOR_BGR2RGB), skipped
+    finally:
+        _stop_decoder(decoder, frames, stop)
@@ -1,93 +1,84 @@
 import streamlit as st
-from fpdf import FPDF
-from PIL import Image
-import re
-import tempfile
-import os
-
-# Function to sanitize text by replacing unsupported Unicode characters
-def sanitize_text(text):
-    if text:
-        # Replace common Unicode characters with their closest ASCII equivalents
-        text = text.replace('\u2013', '-')  # Replace en dash with hyphen
-        text = text.replace('\u2019', "'")  # Replace right single quotation mark with apostrophe
-        text = text.replace('\u2018', "'")  # Replace left single quotation mark with apostrophe
-        text = text.replace('\u201c', '"')  # Replace left double quotation mark with double quote
-        text = text.replace('\u201d', '"')  # Replace right double quotation mark with double quote
-        # Add more replacements as needed
-    return text
-
-# Function to generate PDF with Profile Picture and Resume Sections
-def generate_pdf(name, email, phone, linkedin, github, about_me, education, experience, skills, certifications, image_file):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-
-    # Theme Styling (Hardcoded to "Professional")
-    primary_color = (0, 51, 102)  # Dark blue
-    secondary_color = (0, 102, 204)  # Light blue
-
-    pdf.set_draw_color(*primary_color)
-    pdf.set_text_color(*primary_color)
-    pdf.set_line_width(1)
-    pdf.rect(5, 5, 200, 287)  # Border
-
-    # Profile Picture
-    if image_file is not None:
-        # Save the uploaded image to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-            img = Image.open(image_file)
-            img.save(tmp_file.name, format="PNG")
-            tmp_file_path = tmp_file.name
-
-        # Add the image to the PDF
-        pdf.image(tmp_file_path, x=20, y=20, w=50, h=50)
-        pdf.ln(60)  # Space for image
-
-        # Clean up the temporary file
-        os.remove(tmp_file_path)
-
-    # Name and Contact Info
-    pdf.set_font("Arial", "B", 24)
-    pdf.cell(0, 10, sanitize_text(name), ln=True, align='L')
-    pdf.set_font("Arial", "I", 12)
-    pdf.set_text_color(*secondary_color)
-    pdf.cell(0, 10, f"Phone: {sanitize_text(phone)}", ln=True, align='L')
-    pdf.cell(0, 10, f"Email: {sanitize_text(email)}", ln=True, align='L')
-    pdf.cell(0, 10, f"LinkedIn: {sanitize_text(linkedin)} | GitHub: {sanitize_text(github)}", ln=True, align='L')
-    pdf.ln(10)
-
-    # Resume Sections
-    sections = {
-        "About Me": about_me,
-        "Education": education,
-        "Experience": experience,
-        "Skills": skills,
-        "Certifications": certifications
-    }
-    for section, content in sections.items():
-        pdf.set_font("Arial", "B", 16)
-        pdf.set_text_color(*primary_color)
-        pdf.cell(0, 10, section, ln=True)
-        pdf.set_font("Arial", "", 12)
-        pdf.set_text_color(0, 0, 0)  # Black for content
-        pdf.multi_cell(0, 10, sanitize_text(content))
-        pdf.ln(5)
-
-    return pdf
-
-# Validation Functions
-def validate_email(email):
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(regex, email)
-
-def validate_phone(phone):
-    regex = r'^\+?[0-9]{10,15}$'
-    return re.match(regex, phone)
-
-def validate_url(url):
-    regex = r'^(https?://)?(www\.)?([a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}(/\S*)?$'
-    return re.match(regex, url)
+from PIL import Image, ImageOps
+import base64
+import hashlib
+import html
+import io
+
+from resume_pdf import PHOTO_DPI, PHOTO_QUALITY, PHOTO_SIZE_MM, generate_pdf, pdf_bytes, prepare_photo
+from resume_validation import validate_email, validate_phone, validate_url
+
+# Processed photos are cached per upload hash, so previews and repeat downloads reuse them.
+# The leading underscore keeps Streamlit from hashing the raw bytes again.
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_photo(digest, _data, dpi=PHOTO_DPI, quality=PHOTO_QUALITY):
+    return prepare_photo(_data, PHOTO_SIZE_MM, dpi, quality)
+
+def photo_for_upload(image_file, dpi=PHOTO_DPI, quality=PHOTO_QUALITY):
+    data = image_file.getvalue()
+    return cached_photo(hashlib.sha256(data).hexdigest(), data, dpi, quality)
+
+# Small copy of the upload for the sidebar and the preview, also cached per upload hash,
+# so typing in a text field doesn't decode and re-encode the photo again
+THUMBNAIL_SIZE = 400
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_thumbnail(digest, _data, size=THUMBNAIL_SIZE):
+    img = Image.open(io.BytesIO(_data))
+    img.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((size, size))
+    buffer = io.BytesIO()
+    if img.mode in ("RGBA", "LA", "P"):
+        img.save(buffer, format="PNG")
+        return buffer.getvalue(), "image/png"
+    img.convert("RGB").save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue(), "image/jpeg"
+
+def thumbnail_for_upload(image_file):
+    data = image_file.getvalue()
+    return cached_thumbnail(hashlib.sha256(data).hexdigest(), data)
+
+# Preview HTML is built per section and cached on the section's content hash,
+# so a rerun only rebuilds the section whose text changed
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_section_html(digest, _title, _content):
+    return f"<h2>{html.escape(_title)}</h2><p>{html.escape(_content)}</p>"
+
+def section_html(title, content):
+    digest = hashlib.sha256(f"{title}\0{content}".encode()).hexdigest()
+    return cached_section_html(digest, title, content)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_contact_html(digest, _phone, _email, _linkedin, _github):
+    rows = [("Phone", _phone), ("Email", _email), ("LinkedIn", _linkedin), ("GitHub", _github)]
+    details = "".join(f"<p><strong>{label}:</strong> {html.escape(value)}</p>" for label, value in rows)
+    return f"<div class='contact-details'><h2>Contact Details</h2>{details}</div>"
+
+def contact_html(phone, email, linkedin, github):
+    digest = hashlib.sha256("\0".join((phone, email, linkedin, github)).encode()).hexdigest()
+    return cached_contact_html(digest, phone, email, linkedin, github)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_image_html(digest, _data):
+    thumbnail, mime = cached_thumbnail(digest, _data)
+    encoded = base64.b64encode(thumbnail).decode()
+    return f"<img class='profile-image' src='data:{mime};base64,{encoded}'>"
+
+def image_html_for_upload(image_file):
+    data = image_file.getvalue()
+    return cached_image_html(hashlib.sha256(data).hexdigest(), data)
+
+# The whole preview as one HTML payload, sent with a single st.markdown call
+def preview_html(name, phone, email, linkedin, github, sections, image_html=""):
+    left = image_html + contact_html(phone, email, linkedin, github)
+    right = f"<h1>{html.escape(name)}</h1>" + "".join(section_html(title, content) for title, content in sections)
+    return (
+        "<div class='resume-preview' style='display: flex; gap: 20px;'>"
+        f"<div style='flex: 1;'>{left}</div>"
+        f"<div style='flex: 3;'>{right}</div>"
+        "</div>"
+    )
 
 # Streamlit App Layout with Advanced Styling
 st.markdown("""
@@ -165,9 +156,11 @@ with st.sidebar.expander("Skills & Certifications"):
 # Profile Picture Upload
 with st.sidebar.expander("Profile Picture"):
     image = st.file_uploader("Upload Your Profile Picture", type=["jpg", "jpeg", "png"])
+    photo_dpi = st.select_slider("Photo Resolution (DPI)", [100, 150, 200, 300], PHOTO_DPI)
+    photo_quality = st.slider("Photo JPEG Quality", 50, 95, PHOTO_QUALITY)
     if image is not None:
-        img = Image.open(image)
-        st.image(img, caption="Profile Picture", use_container_width=True)  # Fixed deprecated parameter
+        thumbnail, _ = thumbnail_for_upload(image)
+        st.image(thumbnail, caption="Profile Picture", use_container_width=True)  # Fixed deprecated parameter
         st.session_state.progress = 100
 
 # Display Progress Bar
@@ -177,47 +170,23 @@ st.sidebar.write(f"Completion: {st.session_state.progress}%")
 # Preview Resume
 if st.sidebar.button("Preview Resume"):
     if name and email and phone and about_me and education and experience and skills:
-        st.markdown("<div class='resume-preview'>", unsafe_allow_html=True)
-        
-        # Two-column layout
-        col1, col2 = st.columns([1, 3])
-
-        # Left Column (Profile Picture and Contact Details)
-        with col1:
-            if image is not None:
-                st.image(img, caption="", width=100, use_container_width=False)
-            st.markdown("<div class='contact-details'>", unsafe_allow_html=True)
-            st.markdown("<h2>Contact Details</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p><strong>Phone:</strong> {phone}</p>", unsafe_allow_html=True)
-            st.markdown(f"<p><strong>Email:</strong> {email}</p>", unsafe_allow_html=True)
-            st.markdown(f"<p><strong>LinkedIn:</strong> {linkedin}</p>", unsafe_allow_html=True)
-            st.markdown(f"<p><strong>GitHub:</strong> {github}</p>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        # Right Column (Name, About Me, Education, Experience, Skills, Certifications)
-        with col2:
-            st.markdown(f"<h1>{name}</h1>", unsafe_allow_html=True)
-            st.markdown("<h2>About Me</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p>{about_me}</p>", unsafe_allow_html=True)
-            st.markdown("<h2>Education</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p>{education}</p>", unsafe_allow_html=True)
-            st.markdown("<h2>Experience</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p>{experience}</p>", unsafe_allow_html=True)
-            st.markdown("<h2>Skills</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p>{skills}</p>", unsafe_allow_html=True)
-            st.markdown("<h2>Certifications</h2>", unsafe_allow_html=True)
-            st.markdown(f"<p>{certifications}</p>", unsafe_allow_html=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+        sections = [
+            ("About Me", about_me),
+            ("Education", education),
+            ("Experience", experience),
+            ("Skills", skills),
+            ("Certifications", certifications),
+        ]
+        image_html = image_html_for_upload(image) if image is not None else ""
+        st.markdown(preview_html(name, phone, email, linkedin, github, sections, image_html), unsafe_allow_html=True)
     else:
         st.error("Please fill out all required fields.")
 
 # Generate and Download PDF
 if st.sidebar.button("Download as PDF"):
     if name and email and phone and about_me and education and experience and skills:
-        pdf = generate_pdf(name, email, phone, linkedin, github, about_me, education, experience, skills, certifications, image)
-        pdf.output("resume.pdf")
-        with open("resume.pdf", "rb") as file:
-            btn = st.download_button(label="Download Resume", data=file, file_name="resume.pdf", mime="application/pdf")
+        photo = photo_for_upload(image, photo_dpi, photo_quality) if image is not None else None
+        pdf = generate_pdf(name, email, phone, linkedin, github, about_me, education, experience, skills, certifications, photo)
+        btn = st.download_button(label="Download Resume", data=pdf_bytes(pdf), file_name="resume.pdf", mime="application/pdf")
     else:
         st.error("Please fill out all required fields.")
\ No newline at end of file
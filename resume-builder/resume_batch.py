@@ -0,0 +1,157 @@
+"""Export resumes in bulk from a JSON Lines file into a ZIP of PDFs.
+
+    python resume_batch.py candidates.jsonl resumes.zip --workers 8
+    python resume_batch.py candidates.jsonl - --errors rejected.csv > resumes.zip
+
+Each line is one JSON object with the resume fields (name, email, phone,
+linkedin, github, about_me, education, experience, skills, certifications).
+An optional ``id`` names the PDF and an optional ``photo`` is the path to a
+picture, relative to the JSONL file. Records that fail validation or rendering
+go to the error report and the run carries on.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from functools import partial
+
+from resume_pdf import PHOTO_DPI, PHOTO_QUALITY, PHOTO_SIZE_MM, iter_render, prepare_photo, render_resume
+from resume_validation import record_errors
+
+
+def read_records(jsonl_file):
+    """Stream ``(line_number, record_or_None, error_or_None)`` one line at a time"""
+    for line_number, line in enumerate(jsonl_file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "not a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def output_name(line_number, record, used):
+    """PDF name for a record: its ``id``, or the line number. A name already in
+    ``used`` gets the line number appended so no entry overwrites another."""
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", str(record.get("id") or "")).strip("._")
+    stem = stem or f"resume_{line_number:06d}"
+    name, copy = f"{stem}.pdf", 1
+    while name in used:
+        name = f"{stem}_line{line_number}.pdf" if copy == 1 else f"{stem}_line{line_number}_{copy}.pdf"
+        copy += 1
+    used.add(name)
+    return name
+
+
+def render_record(record, base_dir, dpi=PHOTO_DPI, quality=PHOTO_QUALITY):
+    """Render one record in a worker; returns ``(pdf bytes, pages, error_or_None)``"""
+    try:
+        record = dict(record)
+        if record.get("photo"):
+            with open(os.path.join(base_dir, record["photo"]), "rb") as f:
+                record["photo"] = prepare_photo(f.read(), PHOTO_SIZE_MM, dpi, quality)
+        else:
+            record["photo"] = None
+        data, pages = render_resume(record)
+        return data, pages, None
+    except Exception as e:
+        return None, 0, f"{type(e).__name__}: {e}"
+
+
+def run(jsonl_path, output, errors_path, workers=None, dpi=PHOTO_DPI, quality=PHOTO_QUALITY, log=print):
+    """Render every valid record of ``jsonl_path`` into a ``.zip`` file or ``-`` (ZIP on stdout).
+
+    Rejected records are written to the ``errors_path`` CSV as they are found.
+    Returns a summary dict.
+    """
+    base_dir = os.path.dirname(os.path.abspath(jsonl_path))
+    done = pages = failed = 0
+    # ``(line_number, record)`` of every record handed to the pool; iter_render
+    # yields in input order, so results pair up with the front of the queue
+    in_flight = deque()
+    names = set()
+    start = time.perf_counter()
+
+    with open(jsonl_path, encoding="utf-8-sig") as jsonl_file, open(errors_path, "w", newline="") as errors_file:
+        error_writer = csv.writer(errors_file)
+        error_writer.writerow(["line", "id", "error"])
+
+        def reject(line_number, record, error):
+            nonlocal failed
+            failed += 1
+            error_writer.writerow([line_number, (record or {}).get("id", ""), error])
+            log(f"REJECTED line {line_number}: {error}")
+
+        def valid_records():
+            for line_number, record, error in read_records(jsonl_file):
+                problems = [error] if error else record_errors(record)
+                if problems:
+                    reject(line_number, record, "; ".join(problems))
+                    continue
+                in_flight.append((line_number, record))
+                yield record
+
+        zip_target = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            # fpdf already compresses the page streams, so entries are stored. ZipFile
+            # writes each entry as it arrives, even to an unseekable stdout.
+            with zipfile.ZipFile(zip_target, "w", zipfile.ZIP_STORED) as zip_file:
+                render = partial(render_record, base_dir=base_dir, dpi=dpi, quality=quality)
+                for data, page_count, error in iter_render(valid_records(), workers, render):
+                    line_number, record = in_flight.popleft()
+                    if error:
+                        reject(line_number, record, error)
+                        continue
+                    zip_file.writestr(output_name(line_number, record, names), data)
+                    done += 1
+                    pages += page_count
+                    if done % 500 == 0:
+                        log(f"{done} resumes, {pages / (time.perf_counter() - start):.1f} pages/sec")
+        finally:
+            if zip_target is not sys.stdout.buffer:
+                zip_target.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rendered": done,
+        "failed": failed,
+        "pages": pages,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jsonl", help="JSON Lines file with one resume per line")
+    parser.add_argument("output", help="output .zip file, or - for a ZIP on stdout")
+    parser.add_argument("--errors", default="errors.csv", help="CSV report of rejected records (default: errors.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--photo-dpi", type=int, default=PHOTO_DPI)
+    parser.add_argument("--photo-quality", type=int, default=PHOTO_QUALITY)
+    args = parser.parse_args(argv)
+
+    # Progress goes to stderr so a ZIP on stdout stays clean
+    log = lambda message: print(message, file=sys.stderr)
+    try:
+        summary = run(args.jsonl, args.output, args.errors, args.workers, args.photo_dpi, args.photo_quality, log)
+    except OSError as e:
+        parser.error(str(e))
+
+    log(f"Exported {summary['rendered']} resumes ({summary['failed']} rejected, see {args.errors}) in "
+        f"{summary['seconds']:.1f} s: {summary['pages_per_sec']:.1f} pages/sec")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+import io
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from fpdf import FPDF
+from PIL import Image, ImageOps
+
+# The photo is placed at 50x50 mm; it is downsampled to this many dots per inch
+# of that size and embedded as a JPEG
+PHOTO_SIZE_MM = 50
+PHOTO_DPI = 200
+PHOTO_QUALITY = 85
+
+# Fields of one resume record, in the order generate_pdf takes them
+RESUME_FIELDS = ["name", "email", "phone", "linkedin", "github", "about_me",
+                 "education", "experience", "skills", "certifications"]
+
+# Slack in line-width comparisons, the same multi_cell allows
+TOLERANCE = 1e-9
+# Where body text may wrap
+BREAKS = re.compile(r"([ \t])")
+
+
+# Function to sanitize text by replacing unsupported Unicode characters
+def sanitize_text(text):
+    if text:
+        # Replace common Unicode characters with their closest ASCII equivalents
+        text = text.replace('\u2013', '-')  # Replace en dash with hyphen
+        text = text.replace('\u2019', "'")  # Replace right single quotation mark with apostrophe
+        text = text.replace('\u2018', "'")  # Replace left single quotation mark with apostrophe
+        text = text.replace('\u201c', '"')  # Replace left double quotation mark with double quote
+        text = text.replace('\u201d', '"')  # Replace right double quotation mark with double quote
+        # Add more replacements as needed
+    return text
+
+
+# Downsample the photo to the target DPI for its printed size and re-encode it as JPEG
+def prepare_photo(data, size_mm=PHOTO_SIZE_MM, dpi=PHOTO_DPI, quality=PHOTO_QUALITY):
+    pixels = round(size_mm / 25.4 * dpi)
+    img = Image.open(io.BytesIO(data))
+    # Let the JPEG decoder scale down while decoding instead of decoding all 12 MP
+    img.draft("RGB", (pixels, pixels))
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "P"):
+        # JPEG has no alpha; flatten onto the white page
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    # Same stretch to the square box as before, just at print resolution
+    if img.width > pixels or img.height > pixels:
+        img = img.resize((pixels, pixels), Image.LANCZOS, reducing_gap=3.0)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+class ResumeTemplate:
+    """The "Professional" layout, with the body font metrics measured once.
+
+    The glyph widths of the body font and the usable line width are looked up
+    when the template is built; ``render`` still draws every page from scratch.
+    Body text is wrapped from cached word widths at the same places
+    ``multi_cell`` breaks, without its per-character line-breaking cost, and
+    each line is written as one string.
+    """
+
+    primary_color = (0, 51, 102)  # Dark blue
+    secondary_color = (0, 102, 204)  # Light blue
+    border = (5, 5, 200, 287)
+    font = "helvetica"  # What FPDF maps "Arial" to
+    body_size = 12
+    line_height = 10
+    sections = ["About Me", "Education", "Experience", "Skills", "Certifications"]
+
+    def __init__(self):
+        probe = FPDF()
+        probe.add_page()
+        probe.set_font(self.font, "", self.body_size)
+        self.unit_scale = probe.font_size / 1000  # glyph width units -> mm at the body size
+        self.char_widths = dict(probe.current_font.cw)
+        self.space_width = self.char_widths[" "] * self.unit_scale
+        self.cell_margin = probe.c_margin
+        self.left = probe.l_margin
+        self.text_width = probe.epw - 2 * probe.c_margin
+        # Baseline of a line relative to the top of its cell, as cell() places it
+        self.baseline = 0.5 * self.line_height + 0.3 * probe.font_size
+
+    @lru_cache(maxsize=65536)
+    def word_width(self, word):
+        return sum(self.char_widths.get(c, 0) for c in word) * self.unit_scale
+
+    def _fitting_prefix(self, word, room):
+        """Longest start of ``word`` that fits in ``room``"""
+        width = 0.0
+        for i, c in enumerate(word):
+            width += self.word_width(c)
+            if width > room + TOLERANCE:
+                return word[:i]
+        return word
+
+    def wrap(self, text):
+        """Yield ``(line, width, justify)`` per output line of ``text``.
+
+        Breaks where ``multi_cell`` does: at the last space that fits, or inside
+        a word wider than the line. Runs of spaces and tabs are kept as typed.
+        """
+        paragraphs = text.split("\n")
+        if len(paragraphs) > 1 and not paragraphs[-1]:
+            # A trailing newline doesn't start another line
+            paragraphs.pop()
+        limit = self.text_width + TOLERANCE
+        for number, paragraph in enumerate(paragraphs, start=1):
+            line, width, wrapped = "", 0.0, False
+            # Words alternate with the spaces and tabs between them
+            for i, word in enumerate(BREAKS.split(paragraph)):
+                if i % 2:
+                    gap = self.word_width(word)
+                    if width + gap > limit:
+                        # A space that doesn't fit ends the line and is dropped
+                        yield line, width, True
+                        line, width, wrapped = "", 0.0, True
+                    else:
+                        line += word
+                        width += gap
+                    continue
+                word_width = self.word_width(word)
+                if width + word_width > limit:
+                    cut = max(line.rfind(" "), line.rfind("\t"))
+                    if cut >= 0:
+                        yield line[:cut], self.word_width(line[:cut]), True
+                        wrapped = True
+                        line = line[cut + 1:]
+                        width = self.word_width(line)
+                while width + word_width > limit:
+                    # Nowhere to break: split the word, left aligned like multi_cell
+                    prefix = self._fitting_prefix(word, self.text_width - width) or (word[0] if not line else "")
+                    yield line + prefix, width + self.word_width(prefix), False
+                    word = word[len(prefix):]
+                    line, width, wrapped = "", 0.0, True
+                    word_width = self.word_width(word)
+                line += word
+                width += word_width
+            # The last line of a paragraph is left aligned. Like multi_cell, the
+            # text doesn't end on an empty line left over from a wrap
+            if line or not wrapped or number < len(paragraphs):
+                yield line, width, False
+
+    def write_paragraphs(self, pdf, text):
+        """Write ``text`` one line per ``Tj``, justified lines stretched through word spacing"""
+        for line, width, justify in self.wrap(text):
+            if pdf.y + self.line_height > pdf.page_break_trigger:
+                pdf.add_page()
+            x = self.left + self.cell_margin
+            y = pdf.y + self.baseline
+            spaces = line.count(" ")
+            if justify and spaces:
+                # Tw widens every space of the line, so copied text keeps its spaces
+                pdf._out(f"{(self.text_width - width) / spaces * pdf.k:.3f} Tw")
+                pdf.text(x, y, line)
+                pdf._out("0 Tw")
+            else:
+                pdf.text(x, y, line)
+            pdf.set_xy(self.left, pdf.y + self.line_height)
+
+    def render(self, record, photo=None):
+        """Fill the template with one resume ``record`` (a dict of RESUME_FIELDS)"""
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        pdf.set_draw_color(*self.primary_color)
+        pdf.set_text_color(*self.primary_color)
+        pdf.set_line_width(1)
+        pdf.rect(*self.border)
+
+        # Profile Picture: the prepared JPEG bytes go straight into the PDF, no temp file
+        if photo is not None:
+            pdf.image(io.BytesIO(photo), x=20, y=20, w=PHOTO_SIZE_MM, h=PHOTO_SIZE_MM)
+            pdf.ln(60)  # Space for image
+
+        # Name and Contact Info
+        field = lambda key: sanitize_text(record.get(key) or "")
+        pdf.set_font(self.font, "B", 24)
+        pdf.cell(0, 10, field("name"), new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font(self.font, "I", 12)
+        pdf.set_text_color(*self.secondary_color)
+        pdf.cell(0, 10, f"Phone: {field('phone')}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(0, 10, f"Email: {field('email')}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(0, 10, f"LinkedIn: {field('linkedin')} | GitHub: {field('github')}", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(10)
+
+        # Resume Sections
+        for section, key in zip(self.sections, RESUME_FIELDS[5:]):
+            pdf.set_font(self.font, "B", 16)
+            pdf.set_text_color(*self.primary_color)
+            pdf.cell(0, 10, section, new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font(self.font, "", self.body_size)
+            pdf.set_text_color(0, 0, 0)  # Black for content
+            self.write_paragraphs(pdf, field(key))
+            pdf.ln(5)
+        return pdf
+
+
+@lru_cache(maxsize=1)
+def get_template():
+    """The compiled template, built once per process"""
+    return ResumeTemplate()
+
+
+# Function to generate PDF with Profile Picture and Resume Sections
+def generate_pdf(name, email, phone, linkedin, github, about_me, education, experience, skills, certifications, photo):
+    record = dict(zip(RESUME_FIELDS, (name, email, phone, linkedin, github, about_me,
+                                      education, experience, skills, certifications)))
+    return get_template().render(record, photo)
+
+
+# Render the PDF in memory; every download gets its own bytes, nothing is shared on disk
+def pdf_bytes(pdf):
+    return bytes(pdf.output())
+
+
+def render_resume(record):
+    """Render one record (RESUME_FIELDS plus an optional prepared ``photo``); returns (pdf bytes, pages)"""
+    pdf = get_template().render(record, record.get("photo"))
+    return pdf_bytes(pdf), pdf.pages_count
+
+
+def iter_render(records, max_workers=None, render=render_resume):
+    """Render records across a process pool, yielding ``render(record)`` in input order.
+
+    ``records`` is consumed lazily and only a bounded number of renders is in
+    flight, so any number of records can be streamed through. ``render`` must
+    be picklable (a module-level function or a partial of one).
+    """
+    max_workers = max_workers or os.cpu_count()
+    if max_workers == 1:
+        yield from map(render, records)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for record in records:
+            pending.append(pool.submit(render, record))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def render_many(records, max_workers=None):
+    """Render every record in a worker pool.
+
+    Returns the PDFs (in input order) together with the page count and the
+    throughput in pages/sec.
+    """
+    start = time.perf_counter()
+    pdfs, pages = [], 0
+    for data, page_count in iter_render(records, max_workers):
+        pdfs.append(data)
+        pages += page_count
+    seconds = time.perf_counter() - start
+    return {
+        "pdfs": pdfs,
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_sec": pages / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,47 @@
+import re
+
+from resume_pdf import RESUME_FIELDS
+
+# Fields the app won't build a resume without
+REQUIRED_FIELDS = ["name", "email", "phone", "about_me", "education", "experience", "skills"]
+
+
+# Validation Functions
+def validate_email(email):
+    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(regex, email)
+
+def validate_phone(phone):
+    regex = r'^\+?[0-9]{10,15}$'
+    return re.match(regex, phone)
+
+def validate_url(url):
+    regex = r'^(https?://)?(www\.)?([a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}(/\S*)?$'
+    return re.match(regex, url)
+
+
+# field -> (validator, message), the same checks the form shows errors for
+FIELD_RULES = {
+    "email": (validate_email, "invalid email address"),
+    "phone": (validate_phone, "invalid phone number"),
+    "linkedin": (validate_url, "invalid LinkedIn URL"),
+    "github": (validate_url, "invalid GitHub URL"),
+}
+
+
+def record_errors(record):
+    """Everything wrong with one resume ``record`` (a dict); an empty list means it is valid.
+
+    Only the resume fields are checked; any other keys are left alone.
+    """
+    errors = [f"{field}: must be text" for field in RESUME_FIELDS
+              if record.get(field) is not None and not isinstance(record[field], str)]
+    for field in REQUIRED_FIELDS:
+        value = record.get(field)
+        if value is None or isinstance(value, str) and not value.strip():
+            errors.append(f"{field}: required")
+    for field, (validator, message) in FIELD_RULES.items():
+        value = record.get(field)
+        if isinstance(value, str) and value and not validator(value):
+            errors.append(f"{field}: {message}")
+    return errors
@@ -1,5 +1,13 @@
+import os
+
 import streamlit as st
 
+from resume_auth import AuthBusy, PasswordHasher, SessionTokens, hash_plain_passwords, new_secret
+from resume_store import ResumeStore
+
+# Accounts and resumes live in this SQLite file, shared by every session and process
+DB_PATH = os.environ.get("RESUMEFORGE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "resumeforge.db"))
+
 class Resume:
     def __init__(self, owner_username):
         self.owner = owner_username
@@ -27,11 +35,36 @@ class Resume:
 **Summary:** {self.personal_info['summary']}
 """
 
-if 'users_db' not in st.session_state:
-    st.session_state['users_db'] = {}
-
-if 'resumes' not in st.session_state:
-    st.session_state['resumes'] = {}
+@st.cache_resource
+def get_store():
+    # One connection pool per server process, kept across reruns and sessions
+    return ResumeStore(DB_PATH)
+
+@st.cache_resource
+def get_auth():
+    hasher = PasswordHasher()
+    # Accounts saved before passwords were hashed are converted once, at startup
+    hash_plain_passwords(get_store(), hasher)
+    # The signing secret lives in the database so every server process accepts the same tokens
+    return hasher, SessionTokens(get_store().setting("session_secret", new_secret()))
+
+store = get_store()
+hasher, tokens = get_auth()
+
+def current_user():
+    # Reruns check the signed session token, not the password
+    username = tokens.validate(st.session_state.get('session_token'))
+    if username is None:
+        st.session_state.pop('session_token', None)
+    return username
+
+def load_resume(username):
+    # Only the logged-in user's resume is read, once per session
+    resume = Resume(username)
+    saved = store.load_personal_info(username)
+    if saved:
+        resume.personal_info.update(saved)
+    return resume
 
 def signup():
     st.subheader("Create new account")
@@ -39,12 +72,17 @@ def signup():
     new_email = st.text_input("Email", key="signup_email")
     new_password = st.text_input("Password", type="password", key="signup_password")
     if st.button("Sign Up"):
-        if new_username in st.session_state['users_db']:
-            st.error("Username already exists!")
-        elif not new_username or not new_email or not new_password:
+        if not new_username or not new_email or not new_password:
             st.error("Please fill all fields.")
+            return
+        try:
+            password_hash = hasher.hash(new_password)
+        except AuthBusy as e:
+            st.error(str(e))
+            return
+        if not store.create_user(new_username, new_email, password_hash):
+            st.error("Username already exists!")
         else:
-            st.session_state['users_db'][new_username] = {"email": new_email, "password": new_password}
             st.success("Account created! Please login.")
 
 def login():
@@ -52,10 +90,18 @@ def login():
     username = st.text_input("Username", key="login_username")
     password = st.text_input("Password", type="password", key="login_password")
     if st.button("Login"):
-        user = st.session_state['users_db'].get(username)
-        if user and user["password"] == password:
+        user = store.get_user(username)
+        try:
+            valid = hasher.verify(password, user["password"] if user else None)
+            # Hashes at an older cost are replaced once the password is known
+            if valid and hasher.needs_rehash(user["password"]):
+                store.set_password(username, hasher.hash(password))
+        except AuthBusy as e:
+            st.error(str(e))
+            return
+        if valid:
             st.success(f"Welcome back, {username}!")
-            st.session_state['logged_in_user'] = username
+            st.session_state['session_token'] = tokens.issue(username)
             # Instead of experimental_rerun, stop execution to trigger rerun
             st.experimental_rerun = None  # disable any accidental use
             st.stop()  # stops execution and triggers rerun automatically
@@ -64,10 +110,9 @@ def login():
 
 def personal_info_form(username):
     st.subheader("Add Your Personal Info")
-    if username not in st.session_state['resumes']:
-        st.session_state['resumes'][username] = Resume(username)
-
-    resume = st.session_state['resumes'][username]
+    resume = st.session_state.get('resume')
+    if resume is None or resume.owner != username:
+        resume = st.session_state['resume'] = load_resume(username)
 
     full_name = st.text_input("Full Name", value=resume.personal_info["full_name"])
     email = st.text_input("Email", value=resume.personal_info["email"])
@@ -79,6 +124,7 @@ def personal_info_form(username):
             st.error("Name and Email are required.")
         else:
             resume.update_personal_info(full_name, email, phone, summary)
+            store.save_personal_info(username, resume.personal_info)
             st.success("Personal info saved!")
 
     st.markdown("### Preview:")
@@ -87,19 +133,20 @@ def personal_info_form(username):
 def main():
     st.title("🔥 ResumeForge 🔥")
 
-    if "logged_in_user" not in st.session_state:
+    username = current_user()
+    if username is None:
         option = st.radio("Choose Action:", ["Login", "Sign Up"])
         if option == "Login":
             login()
         else:
             signup()
     else:
-        username = st.session_state['logged_in_user']
         st.write(f"Welcome, **{username}**! You are logged in.")
         personal_info_form(username)
 
         if st.button("Logout"):
-            del st.session_state['logged_in_user']
+            tokens.forget(st.session_state.pop('session_token'))
+            st.session_state.pop('resume', None)
             # Use st.stop() to simulate rerun after logout
             st.stop()
 
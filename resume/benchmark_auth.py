@@ -0,0 +1,79 @@
+"""Benchmark ResumeForge logins at different scrypt costs.
+
+For every cost (log2 of scrypt's N) this times full logins (a username lookup
+in the SQLite store plus the password check in the bounded hasher pool) with
+several concurrent clients. It also times how fast a rerun's token check is
+served from the TTL cache.
+
+    python benchmark_auth.py --costs 12 14 15 16 --clients 8 --logins 64
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resume_auth import HASH_WORKERS, SCRYPT_R, PasswordHasher, SessionTokens, hash_password, new_secret
+from resume_store import ResumeStore
+
+
+def bench_cost(cost, clients, logins, workers):
+    n = 2 ** cost
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResumeStore(os.path.join(tmp, "bench.db"))
+        hasher = PasswordHasher(n=n, workers=workers, max_pending=clients)
+        for i in range(clients):
+            store.create_user(f"user{i}", f"user{i}@example.com", hash_password("correct horse", n))
+
+        def login(i):
+            user = store.get_user(f"user{i % clients}")
+            return hasher.verify("correct horse", user["password"])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            ok = sum(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        store.close()
+    assert ok == logins
+    return {
+        "n": n,
+        "memory_mb": 128 * n * SCRYPT_R / 2 ** 20,
+        "logins_per_sec": logins / elapsed,
+    }
+
+
+def bench_tokens(checks):
+    tokens = SessionTokens(new_secret())
+    token = tokens.issue("user0")
+    start = time.perf_counter()
+    for _ in range(checks):
+        tokens.validate(token)
+    cached = checks / (time.perf_counter() - start)
+    # A token this process didn't issue (another server, or after a restart) is
+    # verified once by its signature and then cached
+    start = time.perf_counter()
+    for _ in range(checks):
+        SessionTokens(tokens.secret).validate(token)
+    uncached = checks / (time.perf_counter() - start)
+    return cached, uncached
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15, 16], help="log2 of scrypt N")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent logins")
+    parser.add_argument("--logins", type=int, default=64, help="logins per cost")
+    parser.add_argument("--workers", type=int, default=HASH_WORKERS, help="hasher pool size")
+    args = parser.parse_args(argv)
+
+    print(f"{'N':>8} {'memory':>8} {'logins/sec':>11}")
+    for cost in args.costs:
+        result = bench_cost(cost, args.clients, args.logins, args.workers)
+        print(f"{'2^%d' % cost:>8} {result['memory_mb']:>6.0f}MB {result['logins_per_sec']:>11.1f}")
+
+    cached, uncached = bench_tokens(100000)
+    print(f"session token checks: {cached:,.0f}/sec from the cache, {uncached:,.0f}/sec by signature")
+
+
+if __name__ == "__main__":
+    main()
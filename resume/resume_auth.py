@@ -0,0 +1,183 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost: 2**14 x 8 uses 16 MB and about 65 ms of one core per hash. Raise
+# SCRYPT_N for more work per guess; stored hashes keep their own parameters and
+# are upgraded the next time their owner logs in.
+SCRYPT_N = int(os.environ.get("RESUMEFORGE_SCRYPT_N", 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Hashes running at once; each holds 128 * N * r bytes, so this also caps the memory
+HASH_WORKERS = 2
+# Logins waiting for a worker beyond this are turned away instead of queueing up
+MAX_PENDING = 32
+
+TOKEN_TTL = 8 * 60 * 60
+
+ENCODED_HASH = re.compile(r"^scrypt\$\d+\$\d+\$\d+\$[A-Za-z0-9_-]+\$[A-Za-z0-9_-]+$")
+
+
+class AuthBusy(Exception):
+    """Too many password checks are already waiting"""
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, salt=None):
+    """Encode ``password`` as ``scrypt$n$r$p$salt$key``"""
+    salt = salt or os.urandom(SALT_BYTES)
+    key = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                         maxmem=256 * n * r, dklen=KEY_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(key)}"
+
+
+def is_password_hash(encoded):
+    return bool(ENCODED_HASH.match(encoded))
+
+
+def verify_password(password, encoded):
+    if not is_password_hash(encoded):
+        return False
+    _, n, r, p, salt, key = encoded.split("$")
+    expected = hash_password(password, int(n), int(r), int(p), _unb64(salt))
+    return hmac.compare_digest(expected.rsplit("$", 1)[1], key)
+
+
+def needs_rehash(encoded, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    return not encoded.startswith(f"scrypt${n}${r}${p}$")
+
+
+class PasswordHasher:
+    """Runs scrypt in a small worker pool, off the Streamlit script threads.
+
+    hashlib releases the GIL while it hashes, so other sessions keep rerunning
+    during a login. At most ``workers`` hashes run at once and at most
+    ``max_pending`` wait; past that ``AuthBusy`` is raised.
+    """
+
+    def __init__(self, n=SCRYPT_N, workers=HASH_WORKERS, max_pending=MAX_PENDING):
+        self.n = n
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        # Checked against for unknown usernames, so a miss takes as long as a wrong password
+        self._dummy_hash = hash_password(new_secret(), n)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy("Too many logins at once, please try again.")
+        try:
+            future = self._pool.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.n)
+
+    def verify(self, password, encoded):
+        """Check ``password`` against a stored hash; ``encoded`` is None for an unknown user"""
+        if encoded is None:
+            self._run(verify_password, password, self._dummy_hash)
+            return False
+        return self._run(verify_password, password, encoded)
+
+    def needs_rehash(self, encoded):
+        return needs_rehash(encoded, self.n)
+
+
+def hash_plain_passwords(store, hasher):
+    """Replace every password still stored in plain text (accounts from before
+    hashing) with its hash; returns how many were converted"""
+    converted = 0
+    for username, password in store.passwords():
+        if is_password_hash(password):
+            continue
+        # Only swapped if the row still holds the plain text, so a concurrent
+        # migration in another process or a password change is never overwritten
+        if store.replace_password(username, password, hasher.hash(password)):
+            converted += 1
+    return converted
+
+
+class SessionTokens:
+    """Signed login tokens, ``username.expiry.signature``, checked through a TTL cache.
+
+    A token is minted once the password checks out; reruns only validate the
+    token. Validated tokens are kept in memory until they expire, so a rerun
+    costs one dictionary lookup.
+    """
+
+    def __init__(self, secret, ttl=TOKEN_TTL, max_entries=10000):
+        self.secret = secret if isinstance(secret, bytes) else secret.encode()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, username):
+        expires = int(time.time()) + self.ttl
+        payload = f"{_b64(username.encode())}.{expires}"
+        token = f"{payload}.{self._sign(payload)}"
+        self._remember(token, username, expires)
+        return token
+
+    def _remember(self, token, username, expires):
+        with self._lock:
+            self._cache[token] = (username, expires)
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def validate(self, token):
+        """The username ``token`` was issued to, or None if it is forged or expired"""
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(token)
+        if cached is not None:
+            username, expires = cached
+            if expires > now:
+                return username
+            self.forget(token)
+            return None
+        try:
+            encoded_name, expires, signature = token.split(".")
+            expires = int(expires)
+            username = _unb64(encoded_name).decode()
+        except ValueError:
+            return None
+        if expires <= now or not hmac.compare_digest(signature, self._sign(f"{encoded_name}.{expires}")):
+            return None
+        self._remember(token, username, expires)
+        return username
+
+    def forget(self, token):
+        with self._lock:
+            self._cache.pop(token, None)
+
+
+def new_secret():
+    return secrets.token_urlsafe(32)
@@ -0,0 +1,145 @@
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_username ON users (username);
+CREATE TABLE IF NOT EXISTS resumes (
+    user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+    full_name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+PERSONAL_INFO_FIELDS = ["full_name", "email", "phone", "summary"]
+
+
+class ResumeStore:
+    """Users and their resumes in one SQLite file, shared by every session.
+
+    The database runs in WAL mode, so any number of sessions read while one
+    writes. Connections come from a small pool instead of being opened per
+    query, with extra ones opened only while the pool is exhausted; a login is
+    a single lookup on the unique username index.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Streamlit runs each session in its own thread, so pooled connections
+        # are handed between threads (one user at a time)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; commits on success, rolls back on error.
+
+        When every pooled connection is in use an extra one is opened, and it is
+        closed afterwards unless the pool has room for it again.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def create_user(self, username, email, password):
+        """Add an account; returns False if the username is taken"""
+        try:
+            with self.connection() as conn:
+                conn.execute("INSERT INTO users (username, email, password, created_at) VALUES (?, ?, ?, ?)",
+                             (username, email, password, time.time()))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def set_password(self, username, password):
+        with self.connection() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (password, username))
+
+    def replace_password(self, username, old, new):
+        """Set the password only if it is still ``old``; returns whether it changed"""
+        with self.connection() as conn:
+            cursor = conn.execute("UPDATE users SET password = ? WHERE username = ? AND password = ?",
+                                  (new, username, old))
+        return cursor.rowcount == 1
+
+    def passwords(self):
+        """``(username, stored password)`` of every account"""
+        with self.connection() as conn:
+            return conn.execute("SELECT username, password FROM users").fetchall()
+
+    def get_user(self, username):
+        with self.connection() as conn:
+            row = conn.execute("SELECT id, username, email, password FROM users WHERE username = ?",
+                               (username,)).fetchone()
+        return dict(row) if row else None
+
+    def load_personal_info(self, username):
+        """The saved personal info of ``username``, or None if they haven't saved any"""
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT r.full_name, r.email, r.phone, r.summary FROM resumes r "
+                "JOIN users u ON u.id = r.user_id WHERE u.username = ?", (username,)).fetchone()
+        return dict(row) if row else None
+
+    def save_personal_info(self, username, personal_info):
+        values = [personal_info.get(field, "") for field in PERSONAL_INFO_FIELDS]
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO resumes (user_id, full_name, email, phone, summary, updated_at) "
+                "SELECT id, ?, ?, ?, ?, ? FROM users WHERE username = ? "
+                "ON CONFLICT (user_id) DO UPDATE SET full_name = excluded.full_name, email = excluded.email, "
+                "phone = excluded.phone, summary = excluded.summary, updated_at = excluded.updated_at",
+                (*values, time.time(), username))
+
+    def setting(self, key, default):
+        """Stored value of ``key``; the first caller's ``default`` is stored and wins for everyone"""
+        with self.connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, default))
+            return conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()[0]
+
+    def count_users(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return